@@ -0,0 +1,73 @@
+import numpy as np
+
+
+# Returns for each row of the cost matrix the column assigned to it, or -1 if it gets no column,
+# such that the sum of the costs of the assigned pairs is minimal (Hungarian algorithm).
+# Rows and columns are handled in order, so agents with the same cost matrix get the same assignment.
+def hungarian(cost_matrix):
+    cost = np.array(cost_matrix, dtype=float)
+    n_rows, n_cols = cost.shape
+    if n_rows == 0 or n_cols == 0:
+        return [-1] * n_rows
+
+    # The algorithm assigns every row, so there may not be more rows than columns
+    transposed = n_rows > n_cols
+    if transposed:
+        cost = cost.T
+
+    # Unreachable targets get a cost higher than any assignment of reachable targets
+    finite = np.isfinite(cost)
+    max_cost = np.max(cost[finite]) if finite.any() else 0.0
+    cost[~finite] = (max_cost + 1) * cost.size
+
+    n, m = cost.shape
+    u = [0.0] * (n + 1)
+    v = [0.0] * (m + 1)
+    # Row assigned to each column (1-based, 0 is unassigned)
+    p = [0] * (m + 1)
+    way = [0] * (m + 1)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        min_v = [np.inf] * (m + 1)
+        used = [False] * (m + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            delta = np.inf
+            j1 = 0
+            for j in range(1, m + 1):
+                if not used[j]:
+                    reduced = cost[i0 - 1, j - 1] - u[i0] - v[j]
+                    if reduced < min_v[j]:
+                        min_v[j] = reduced
+                        way[j] = j0
+                    if min_v[j] < delta:
+                        delta = min_v[j]
+                        j1 = j
+            for j in range(m + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_v[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        # Flip the augmenting path
+        while j0 != 0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    assignment = [-1] * n
+    for j in range(1, m + 1):
+        if p[j] != 0:
+            assignment[p[j] - 1] = j - 1
+
+    if transposed:
+        transposed_assignment = [-1] * n_rows
+        for column, row in enumerate(assignment):
+            transposed_assignment[row] = column
+        return transposed_assignment
+    return assignment
@@ -0,0 +1,71 @@
+import time
+
+from matrx.agents.agent_utils.navigator import get_move_actions
+
+
+class DecisionBudget:
+    def __init__(self, agent):
+        self.agent = agent
+        # Max milliseconds and max number of distance searches per tick, None for no limit
+        self.max_ms = agent.settings.get("decision_budget_ms")
+        self.max_searches = agent.settings.get("decision_budget_searches")
+        self._start = None
+        self._searches = 0
+        self._exhausted = False
+        # Move action names keyed by their (dx, dy)
+        self._move_actions = None
+        # Number of ticks in which the budget ran out, so a decision was continued in a later tick
+        self.nr_exhausted = 0
+
+    # Returns True if the agent has a budget
+    def is_limited(self):
+        return self.max_ms is not None or self.max_searches is not None
+
+    # Start the budget of a new tick
+    def start_tick(self):
+        self._start = time.perf_counter()
+        self._searches = 0
+        self._exhausted = False
+
+    # Count a distance search
+    def spend_search(self):
+        self._searches += 1
+
+    # Returns True if the budget of this tick is used up
+    def exhausted(self):
+        if not self._exhausted and (
+                (self.max_ms is not None and (time.perf_counter() - self._start) * 1000 >= self.max_ms)
+                or (self.max_searches is not None and self._searches >= self.max_searches)
+        ):
+            self._exhausted = True
+            self.nr_exhausted += 1
+        return self._exhausted
+
+    # Search the distances to the target locations that are not known yet, as far as the budget allows.
+    # Returns True if all distances are known, False if the decision has to be continued in the next tick.
+    # At least one search is done per tick, so a decision always finishes.
+    def prepare_distances(self, locations):
+        if not self.is_limited():
+            # Without a budget the distances are searched when they are needed
+            return True
+        oracle = self.agent.distance_oracle
+        missing = [location for location in dict.fromkeys(map(tuple, locations)) if not oracle.has_distances(location)]
+        for i, location in enumerate(missing):
+            if i > 0 and self.exhausted():
+                return False
+            oracle.distance(self.agent.location, location)
+        return True
+
+    # Returns the move action towards the closest location of which the distance is already known,
+    # the best target found so far. The move follows the searched distances, so it needs no path planning.
+    def move_towards_closest_known(self, locations):
+        oracle = self.agent.distance_oracle
+        known = [location for location in locations if oracle.has_distances(location)]
+        target = min(known, key=lambda location: oracle.distance(self.agent.location, location))
+        delta = oracle.next_move(self.agent.location, target)
+        if delta is None:
+            return None, {}
+        if self._move_actions is None:
+            self._move_actions = {move_delta: action_name
+                                  for action_name, move_delta in get_move_actions(self.agent.action_set).items()}
+        return self._move_actions[delta], {}
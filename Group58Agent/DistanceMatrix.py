@@ -0,0 +1,39 @@
+import numpy as np
+
+from Group58Agent.util import path_length
+
+
+class DistanceMatrix:
+    def __init__(self, agent):
+        self.agent = agent
+        self._key = None
+        self._matrix = None
+        # Row of each agent in the matrix
+        self._rows = {}
+
+    # Returns the path lengths from an agent to each target location.
+    # The rows of all agents with a known location are computed together once per tick,
+    # and only recomputed in the same tick if the targets change.
+    def get(self, agent_id, target_locations):
+        key = (self.agent.state["World"]["nr_ticks"], tuple(tuple(location) for location in target_locations))
+        if key != self._key:
+            self._build(key, target_locations)
+        if agent_id not in self._rows:
+            self._add_row(agent_id, target_locations)
+        return self._matrix[self._rows[agent_id]]
+
+    # Compute the path lengths of this agent and all other agents in range to the targets
+    def _build(self, key, target_locations):
+        self._key = key
+        self._matrix = np.empty((0, len(target_locations)))
+        self._rows = {}
+        self._add_row(self.agent.agent_id, target_locations)
+        for other_agent in self.agent.other_agents:
+            if other_agent.location is not None:
+                self._add_row(other_agent.agent_id, target_locations)
+
+    def _add_row(self, agent_id, target_locations):
+        start_location = self.agent.state[agent_id]["location"]
+        row = [path_length(self.agent, start_location, location) for location in target_locations]
+        self._rows[agent_id] = len(self._matrix)
+        self._matrix = np.vstack([self._matrix, np.array(row, dtype=float).reshape(1, len(target_locations))])
@@ -0,0 +1,115 @@
+from collections import deque
+
+import numpy as np
+from matrx.agents import StateTracker
+from matrx.agents.agent_utils.navigator import get_move_actions
+
+
+class DistanceOracle:
+    def __init__(self, agent):
+        self.agent = agent
+        self._occupation_map = None
+        self._move_deltas = []
+        self._doors = {}
+        # Incremented every time a door is opened or closed
+        self._doors_version = 0
+        # BFS distance grids keyed by target location
+        self._distances = {}
+
+    # Build the occupation map once per world layout and precompute distances to all doors and drop offs
+    def build(self, state):
+        state_tracker = StateTracker(self.agent.agent_id)
+        self._occupation_map, _ = state_tracker.get_traversability_map(inverted=True, state=state)
+        self._move_deltas = [delta for delta in get_move_actions(state[self.agent.agent_id]["action_set"]).values()
+                             if delta != (0, 0)]
+        self._doors = {}
+        for room in self.agent.rooms:
+            door = state[room.obj_id]
+            self._doors[room.obj_id] = (door["location"], door["is_open"])
+        self._distances = {}
+
+        for room in self.agent.rooms:
+            self._bfs(room.location)
+        for drop_off in self.agent.drop_offs:
+            self._bfs(drop_off.location)
+
+    # Invalidate the distances if a door was opened or closed since the last tick
+    def update(self, state):
+        if self._occupation_map is None:
+            self.build(state)
+            return
+
+        changed = False
+        # Only doors that changed or came back into view since the last tick can have been opened or closed
+        for obj_id in (state.get_changed_ids() | state.get_added_ids()) & self._doors.keys():
+            location, is_open = self._doors[obj_id]
+            door = state[obj_id]
+            if door["is_open"] != is_open:
+                self._doors[obj_id] = (location, door["is_open"])
+                self._occupation_map[location[0], location[1]] = int(not door["is_open"])
+                changed = True
+
+        if changed:
+            self._doors_version += 1
+            # The distances are searched again when they are needed, so a tick in which a door changes
+            # does not pay for the searches of all targets at once
+            self._distances = {}
+
+    # Returns True if agents can move onto the location, walls and closed doors are not traversable
+    def is_traversable(self, location):
+        return self._occupation_map[location[0], location[1]] == 0
+
+    # Returns the occupation map with 0 for traversable and 1 for blocked tiles, indexed by [x, y]
+    def get_occupation_map(self):
+        return self._occupation_map
+
+    # Returns the number of times a door was opened or closed
+    def get_doors_version(self):
+        return self._doors_version
+
+    # Returns True if the distances to the target are known, so distance does not need a new search
+    def has_distances(self, target_location):
+        return tuple(target_location) in self._distances
+
+    # Returns the (dx, dy) of a move from start that is one move closer to the target, None if there is none
+    def next_move(self, start_location, target_location):
+        distance = self.distance(start_location, target_location)
+        distances = self._distances[tuple(target_location)]
+        width, height = self._occupation_map.shape
+        x, y = start_location
+        for dx, dy in self._move_deltas:
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height and distances[nx, ny] < distance:
+                return dx, dy
+        return None
+
+    # Returns the number of moves from start to target, np.inf if the target cannot be reached
+    def distance(self, start_location, target_location):
+        start_location = tuple(start_location)
+        target_location = tuple(target_location)
+        distances = self._distances.get(target_location)
+        if distances is None:
+            distances = self._bfs(target_location)
+        return distances[start_location]
+
+    # Breadth first search from the target over all traversable tiles
+    def _bfs(self, target_location):
+        self.agent.decision_budget.spend_search()
+        target_location = tuple(target_location)
+        width, height = self._occupation_map.shape
+        distances = np.full((width, height), np.inf)
+        distances[target_location] = 0
+
+        queue = deque([target_location])
+        while queue:
+            x, y = queue.popleft()
+            next_distance = distances[x, y] + 1
+            for dx, dy in self._move_deltas:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < width and 0 <= ny < height and self._occupation_map[nx, ny] == 0 \
+                        and distances[nx, ny] == np.inf:
+                    distances[nx, ny] = next_distance
+                    queue.append((nx, ny))
+
+        self._distances[target_location] = distances
+        return distances
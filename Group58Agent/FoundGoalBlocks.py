@@ -0,0 +1,53 @@
+class FoundGoalBlocks:
+    def __init__(self):
+        # All blocks keyed by insertion number, so iterating keeps the order in which blocks were found
+        self._blocks = {}
+        # Insertion numbers of the blocks keyed by location and by (shape, colour)
+        self._by_location = {}
+        self._by_type = {}
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def __iter__(self):
+        return iter(list(self._blocks.values()))
+
+    # Returns true if an equal block is stored at the location of the block
+    def __contains__(self, block):
+        for block_id in self._by_location.get(tuple(block["location"]), ()):
+            if self._blocks[block_id] == block:
+                return True
+        return False
+
+    # Add a found goal block
+    def add(self, block):
+        block_id = self._next_id
+        self._next_id += 1
+        self._blocks[block_id] = block
+        self._by_location.setdefault(tuple(block["location"]), set()).add(block_id)
+        self._by_type.setdefault((block["shape"], block["colour"]), set()).add(block_id)
+
+    # Remove all blocks at a location
+    def remove_at(self, location):
+        for block_id in self._by_location.pop(tuple(location), ()):
+            block = self._blocks.pop(block_id)
+            block_type = (block["shape"], block["colour"])
+            self._by_type[block_type].discard(block_id)
+            if not self._by_type[block_type]:
+                del self._by_type[block_type]
+
+    # Returns true if a block is stored at the location
+    def has_block_at(self, location):
+        return tuple(location) in self._by_location
+
+    # Returns the blocks at a location in the order they were found
+    def at(self, location):
+        return [self._blocks[block_id] for block_id in sorted(self._by_location.get(tuple(location), ()))]
+
+    # Returns the blocks that can be delivered at a drop off, in the order they were found.
+    # Blocks found by a colourblind agent have no colour and match any colour.
+    def candidates(self, drop_off):
+        block_ids = self._by_type.get((drop_off.shape, drop_off.colour), set()) \
+                    | self._by_type.get((drop_off.shape, ""), set())
+        return [self._blocks[block_id] for block_id in sorted(block_ids)]
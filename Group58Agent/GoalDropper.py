@@ -1,11 +1,15 @@
 import numpy as np
 
-from Group58Agent.util import path
+from Group58Agent.Allocation import hungarian
+from Group58Agent.DistanceMatrix import DistanceMatrix
+from Group58Agent.PhaseHandler import Phase
+from Group58Agent.util import agents_in_phase
 
 
 class GoalDropper:
     def __init__(self, agent):
         self.agent = agent
+        self._distances = DistanceMatrix(agent)
 
     # returns the closest goal block that can be delivered and its distance to agent
     def find_goal_block(self, agent_id):
@@ -13,30 +17,13 @@ class GoalDropper:
         if current_drop_off is None or len(self.agent.found_goal_blocks) == 0:
             return None, None
 
-        # Order possible goal blocks by distance to agent
-        distances = []
-        current_goal_blocks_found = []
-        for found_goal_block in self.agent.found_goal_blocks:
-            if (found_goal_block["colour"] == current_drop_off["colour"] or found_goal_block["colour"] == "") \
-                    and found_goal_block["shape"] == current_drop_off["shape"]:
-                start_location = self.agent.state[agent_id]["location"]
-                target_location = found_goal_block["location"]
-                distances.append(
-                    len(
-                        path(
-                            agent_id, self.agent.state, start_location, target_location
-                        )
-                    )
-                )
-                current_goal_blocks_found.append(found_goal_block)
+        current_goal_blocks_found = self.agent.found_goal_blocks.candidates(current_drop_off)
 
-        if len(distances) > 0:
+        if len(current_goal_blocks_found) > 0:
             # return closest goal block
-            idx = np.argsort(distances)
-            return (
-                np.array(current_goal_blocks_found)[idx][0],
-                np.array(distances)[idx][0],
-            )
+            distances = self._distances.get(agent_id, [block["location"] for block in current_goal_blocks_found])
+            idx = np.argsort(distances)[0]
+            return current_goal_blocks_found[idx], distances[idx]
         else:  # no goal blocks found
             return None, None
 
@@ -46,16 +33,16 @@ class GoalDropper:
         # In case of draw choose smallest agent_idx
         for other_agent in self.agent.other_agents:
             if (
-                    other_agent["phase"] == "CHOOSE_GOAL"
-                    and other_agent["location"] is not None
+                    other_agent.phase == Phase.CHOOSE_GOAL
+                    and other_agent.location is not None
             ):
                 other_goal_block, other_distance = self.find_goal_block(
-                    other_agent["agent_id"]
+                    other_agent.agent_id
                 )
                 if goal_block["location"] == other_goal_block["location"]:
                     if distance == other_distance:
                         # choose agent with lowest idx
-                        if self.agent.agent_idx > other_agent["agent_idx"]:
+                        if self.agent.agent_idx > other_agent.agent_idx:
                             return True
                     else:
                         # choose smallest distance
@@ -63,15 +50,29 @@ class GoalDropper:
                             return True
         return False
 
+    # Returns the goal block assigned to us and its distance when the agents we see choosing a goal are assigned a
+    # different block with the smallest total distance, (None, None) if we are not assigned a block
+    def allocate_goal_block(self):
+        current_drop_off = self.agent.get_next_drop_off()
+        if current_drop_off is None:
+            return None, None
+        goal_blocks = self.agent.found_goal_blocks.candidates(current_drop_off)
+        locations = [block["location"] for block in goal_blocks]
+        agent_ids = agents_in_phase(self.agent, Phase.CHOOSE_GOAL)
+        distances = [self._distances.get(agent_id, locations) for agent_id in agent_ids]
+        row = agent_ids.index(self.agent.agent_id)
+        idx = hungarian(distances)[row]
+        if idx < 0:
+            return None, None
+        return goal_blocks[idx], distances[row][idx]
+
     # Returns the block at a certain location
     def get_block_info(self, find_block):
-        blocks = self.agent.state.get_with_property({"is_collectable": True})
-        if blocks is not None:
-            # Go over each block in the field of view
-            for block in blocks:
-                if find_block["location"] == block["location"]:
-                    block = {"colour": block["visualization"]["colour"], "shape": block["visualization"]["shape"],
-                             "location": block["location"], "size": block["visualization"]["size"],
-                             "obj_id": block["obj_id"]}
-                    return block
+        # Go over each object at the location of the block
+        for block in self.agent.state.get_objects_at(find_block["location"]):
+            if block.get("is_collectable") is True:
+                block = {"colour": block["visualization"]["colour"], "shape": block["visualization"]["shape"],
+                         "location": block["location"], "size": block["visualization"]["size"],
+                         "obj_id": block["obj_id"]}
+                return block
         return None
@@ -3,16 +3,19 @@ from typing import Dict
 
 from matrx.actions.door_actions import OpenDoorAction
 from matrx.actions.object_actions import DropObject, GrabObject
-from matrx.agents.agent_utils.navigator import Navigator
-from matrx.agents.agent_utils.state_tracker import StateTracker
 
+from Group58Agent.DecisionBudget import DecisionBudget
+from Group58Agent.DistanceOracle import DistanceOracle
+from Group58Agent.FoundGoalBlocks import FoundGoalBlocks
 from Group58Agent.GoalDropper import GoalDropper
+from Group58Agent.Knowledge import DELIVERED, GRABBED, DropOffs, OtherAgents, Rooms
 from Group58Agent.MessageHandler import MessageHandler
+from Group58Agent.PathFollower import PathFollower
 from Group58Agent.PhaseHandler import PhaseHandler, Phase
 from Group58Agent.RoomChooser import RoomChooser
 from Group58Agent.RoomVisiter import RoomVisiter
 from Group58Agent.Trust import Trust
-from Group58Agent.util import move_to, is_on_location, path
+from Group58Agent.util import move_to, is_on_location, path_length, room_size
 from bw4t.BW4TBrain import BW4TBrain
 
 
@@ -21,20 +24,22 @@ class Group58Agent(BW4TBrain):
         super().__init__(settings)
         self.settings = settings
         self.state = None
-        self.state_tracker = None
-        self.navigator = None
         self.location = (1, 1)
-        self.rooms = []
-        self.drop_offs = []
-        self.found_goal_blocks = []
-        self.other_agents = []
+        self.rooms = Rooms()
+        self.drop_offs = DropOffs()
+        self.found_goal_blocks = FoundGoalBlocks()
+        self.other_agents = OtherAgents()
         self.agent_idx = None
         self.msg_handler = MessageHandler(self)
         self.phase_handler = PhaseHandler(self)
         self.room_chooser = RoomChooser(self)
         self.room_visiter = RoomVisiter(self)
         self.goal_dropper = GoalDropper(self)
+        self.distance_oracle = DistanceOracle(self)
+        self.path_follower = PathFollower(self)
+        self.decision_budget = DecisionBudget(self)
         self.trust_model = None
+        self._initialized = False
 
         # We start by choosing a room
         self.phase = Phase.CHOOSE_ROOM
@@ -60,49 +65,47 @@ class Group58Agent(BW4TBrain):
 
         self._chosen_goal_blocks = []
 
-    def initialize(self):
-        super().initialize()
-        self.state_tracker = StateTracker(agent_id=self.agent_id)
-        self.navigator = Navigator(
-            agent_id=self.agent_id,
-            action_set=self.action_set,
-            algorithm=Navigator.A_STAR_ALGORITHM,
-        )
+    # Write the trust values of this run to disk and report our counters to the profiler
+    def episode_ended(self):
+        if self.trust_model is not None:
+            self.trust_model.flush()
+        self.report_counter("route_plans", self.path_follower.nr_plans)
+        self.report_counter("avoided_route_plans", self.path_follower.nr_avoided_plans)
+        if self.decision_budget.is_limited():
+            self.report_counter("budget_exhausted", self.decision_budget.nr_exhausted)
 
     # Initialize doors and goal
     def _initialize_state(self, state):
-        # Initialise goal block array
-        i = 0
-        for block in state.values():
-            if (
-                    "class_inheritance" in block
-                    and "GhostBlock" in block["class_inheritance"]
-            ):
-                self.drop_offs.append(
-                    {
-                        "colour": block["visualization"]["colour"],
-                        "shape": block["visualization"]["shape"],
-                        "size": block["visualization"]["size"],
-                        "location": block["location"],
-                        "delivered": False,
-                        "grabbed": False,
-                        "n": i,
-                    }
+        if self.world_layout is not None:
+            # Take the drop offs and rooms from the layout given by the world
+            for drop_off in self.world_layout["drop_offs"]:
+                self.drop_offs.add(drop_off["colour"], drop_off["shape"], drop_off["size"], drop_off["location"])
+            for room in self.world_layout["rooms"]:
+                door_location = room["door_location"]
+                self.rooms.add(room["room_name"], (door_location[0], door_location[1] + 1), room["door_id"],
+                               room["room_size"])
+        else:
+            # Initialise goal block array
+            for block in state.get_of_type("GhostBlock") or []:
+                self.drop_offs.add(
+                    block["visualization"]["colour"],
+                    block["visualization"]["shape"],
+                    block["visualization"]["size"],
+                    block["location"],
                 )
-                i += 1
-
-        # Initialise room array
-        for room in state.values():
-            if "class_inheritance" in room and "Door" in room["class_inheritance"]:
-                self.rooms.append(
-                    {
-                        "room_name": room["room_name"],
-                        "location": (room["location"][0], room["location"][1] + 1),
-                        "obj_id": room["obj_id"],
-                        "visited": False,
-                        "last_agent_id": None,
-                        "visited_by_me": False,
-                    }
+
+            # Locations of the area tiles inside each room, to get the size of the rooms
+            room_tiles = {}
+            for tile in state.get_of_type("AreaTile") or []:
+                room_tiles.setdefault(tile.get("room_name"), []).append(tile["location"])
+
+            # Initialise room array
+            for room in state.get_of_type("Door") or []:
+                self.rooms.add(
+                    room["room_name"],
+                    (room["location"][0], room["location"][1] + 1),
+                    room["obj_id"],
+                    room_size(room_tiles.get(room["room_name"])),
                 )
 
         # Initialise other_agents array
@@ -110,21 +113,13 @@ class Group58Agent(BW4TBrain):
             if agent == self.agent_id:
                 self.agent_idx = i
             else:
-                self.other_agents.append(
-                    {
-                        "agent_id": agent,
-                        "agent_idx": i,
-                        "location": (1, 1),
-                        "phase": "CHOOSE_ROOM",
-                    }
-                )
+                self.other_agents.add(agent, i)
         self.trust_model = Trust(self)
+        self._initialized = True
 
     # Returns a room from a room name
     def get_room(self, room_name):
-        for room in self.rooms:
-            if room["room_name"] == room_name:
-                return room
+        return self.rooms.get(room_name)
 
     # Returns true with certain probability
     def lazy_skip(self):
@@ -138,46 +133,55 @@ class Group58Agent(BW4TBrain):
     # if all goals were delivered return None
     def get_next_drop_off(self):
         if self.settings["strong"]:
-            for drop_off in self.drop_offs:
-                if not drop_off["delivered"] and not drop_off["grabbed"]:
-                    return drop_off
-        else:
-            for drop_off in self.drop_offs:
-                if not drop_off["delivered"]:
-                    return drop_off
-        return None
+            return self.drop_offs.first_without(DELIVERED | GRABBED)
+        return self.drop_offs.first_without(DELIVERED)
 
     # Return true if block matches drop off
     def matches_drop_off(self, block, drop_off_n):
-        return block is not None and self.drop_offs[drop_off_n]["colour"] == block["colour"] and \
-               self.drop_offs[drop_off_n]["shape"] == block["shape"]
+        return block is not None and self.drop_offs[drop_off_n].colour == block["colour"] and \
+               self.drop_offs[drop_off_n].shape == block["shape"]
 
     # Update the positions of all agents
     def _update_agent_locations(self):
-        self.state_tracker.update(self.state)
         self.location = self.state[self.agent_id]["location"]
 
         for other_agent in self.other_agents:
-            if self.state[other_agent["agent_id"]] is None:
+            if self.state[other_agent.agent_id] is None:
                 # The other agent is outside our range
-                other_agent["location"] = None
+                other_agent.location = None
             else:
-                other_agent["location"] = self.state[other_agent["agent_id"]][
+                other_agent.location = self.state[other_agent.agent_id][
                     "location"
                 ]
 
     # Choose action to perform
     def decide_on_bw4t_action(self, state):
-        if not self.rooms:
-            # we initialise our room map and goal array
+        self.decision_budget.start_tick()
+        if not self._initialized:
+            # we initialise our room map and goal array once, worlds without doors have no rooms
             self._initialize_state(state)
 
         self._update_agent_locations()
-        self.msg_handler.read_messages()
+        with self.profile("read_messages"):
+            self.msg_handler.read_messages()
         self.state = state
+        with self.profile("distance_update"):
+            self.distance_oracle.update(self.state)
+        self.trust_model.tick(self.state["World"]["nr_ticks"])
+
+        with self.profile("phase_" + self.phase.name):
+            return self._decide_phase_action()
 
+    # Decide on an action for the current phase
+    def _decide_phase_action(self):
         # Choosing a room
         if self.phase_handler.phase_is(Phase.CHOOSE_ROOM):
+            # Search the distances to the rooms, spread over several ticks if the decision budget runs out
+            room_locations = [room.location for room in self.room_chooser.get_candidate_rooms()]
+            if not self.decision_budget.prepare_distances(room_locations):
+                # Move towards the closest room found so far and continue choosing in the next tick
+                return self.decision_budget.move_towards_closest_known(room_locations)
+
             # Get closest room and distance to it
             room, distance = self.room_chooser.choose_room(self.agent_id)
 
@@ -189,8 +193,16 @@ class Group58Agent(BW4TBrain):
 
                 return None, {}
 
-            # Check if we are the closest agent (with phase CHOOSE_ROOM) to the room
-            if self.room_chooser.room_conflict(room, distance):
+            if self.settings.get("optimal_allocation", False):
+                # Take the room assigned to us by the optimal assignment of the agents we see choosing a room.
+                # Other agents may see other agents and rooms, so the closest agent still wins a room we both want
+                room, distance = self.room_chooser.allocate_room()
+                conflict = room is None or self.room_chooser.room_conflict(room, distance)
+            else:
+                # Check if we are the closest agent (with phase CHOOSE_ROOM) to the room
+                conflict = self.room_chooser.room_conflict(room, distance)
+
+            if conflict:
                 # Continue with phase CHOOSE_ROOM
                 return None, {}
             else:
@@ -198,70 +210,65 @@ class Group58Agent(BW4TBrain):
                 self._chosen_room = room
                 self.phase = Phase.GO_TO_ROOM
                 # Mark room as visited
-                room = self.get_room(self._chosen_room["room_name"])
-                room["visited"] = True
-                room["visited_by_me"] = True
-                room["last_agent_id"] = self.agent_id
+                room = self.get_room(self._chosen_room.room_name)
+                room.visited = True
+                room.visited_by_me = True
+                room.last_agent_id = self.agent_id
                 # Inform other agents that we are going to the room
-                self.msg_handler.send_moving_to_room(self._chosen_room["room_name"])
+                self.msg_handler.send_moving_to_room(self._chosen_room.room_name)
                 # Are we going to lazy/lie skip during moving to room
                 self.skip_move_to_room = (self.lazy_skip() or self.lie()) and not self.room_chooser.all_rooms_visited()
 
                 # Store path length to room
-                self._path_length_move_to_room = len(
-                    path(self.agent_id, self.state, self.location, self._chosen_room["location"]))
-                return move_to(self, self._chosen_room["location"])
+                self._path_length_move_to_room = path_length(self, self.location, self._chosen_room.location)
+                return move_to(self, self._chosen_room.location)
 
         # Going to a room
         elif self.phase_handler.phase_is(Phase.GO_TO_ROOM):
-            if is_on_location(self, self._chosen_room["location"]):
+            if is_on_location(self, self._chosen_room.location):
                 self.phase = Phase.OPEN_DOOR
                 # Inform other agents that we are opening a door
-                self.msg_handler.send_opening_door(self._chosen_room["room_name"])
+                self.msg_handler.send_opening_door(self._chosen_room.room_name)
                 return None, {}
             else:
                 # We skip moving to the room if we are halfway through the path
-                if self.skip_move_to_room and len(path(self.agent_id, self.state, self.location, self._chosen_room[
-                    "location"])) / self._path_length_move_to_room < 0.5:
+                if self.skip_move_to_room and path_length(self, self.location, self._chosen_room.location) \
+                        / self._path_length_move_to_room < 0.5:
                     self.phase = Phase.CHOOSE_ROOM
                     # Mark visited_by_me as False since we didnt fully visit the room
-                    self.get_room(self._chosen_room["room_name"])["visited_by_me"] = False
+                    self.get_room(self._chosen_room.room_name).visited_by_me = False
                     # Delete temp variable
                     self._chosen_room = None
                     self.skip_move_to_room = False
                     return None, {}
                 else:
-                    return move_to(self, self._chosen_room["location"])
+                    return move_to(self, self._chosen_room.location)
 
         # Opening a room door
         elif self.phase_handler.phase_is(Phase.OPEN_DOOR):
             self.phase = Phase.SEARCH_ROOM
             # Inform other agents that we are searching a room
-            self.msg_handler.send_searching_room(self._chosen_room["room_name"])
+            self.msg_handler.send_searching_room(self._chosen_room.room_name)
             # Are we going to lazy/lie skip during the room search
             self.skip_room_search = (self.lazy_skip() or self.lie()) and not \
                 self.room_chooser.all_rooms_visited()
             if self.skip_room_search:
                 # Mark visited_by_me as False since we didnt fully visit the room
-                self.get_room(self._chosen_room["room_name"])["visited_by_me"] = False
+                self.get_room(self._chosen_room.room_name).visited_by_me = False
             # Are we going to lie that we found a goal block
             if self.lie():
-                lie = True
                 # Check if no other goal block is on (1, 1)
-                for found_block in self.found_goal_blocks:
-                    if found_block["location"] == (1, 1):
-                        lie = False
-                        break
+                lie = not self.found_goal_blocks.has_block_at((1, 1))
                 if lie and self.lied_goal_n < len(self.drop_offs):
                     # Send current goal block to all other agents at start position
                     self.msg_handler.send_found_goal_block(
-                        {"colour": self.drop_offs[self.lied_goal_n]["colour"],
-                         "shape": self.drop_offs[self.lied_goal_n]["shape"],
+                        {"colour": self.drop_offs[self.lied_goal_n].colour,
+                         "shape": self.drop_offs[self.lied_goal_n].shape,
                          "location": (1, 1),
-                         "size": self.drop_offs[self.lied_goal_n]["size"]})
+                         "size": self.drop_offs[self.lied_goal_n].size})
                     self.lied_goal_n += 1
                 # Open door
-            return OpenDoorAction.__name__, {"object_id": self._chosen_room["obj_id"]}
+            return OpenDoorAction.__name__, {"object_id": self._chosen_room.obj_id}
 
         # Searching goal blocks in a room
         elif self.phase_handler.phase_is(Phase.SEARCH_ROOM):
@@ -270,6 +277,14 @@ class Group58Agent(BW4TBrain):
 
         # Searching for closest goal block
         elif self.phase_handler.phase_is(Phase.CHOOSE_GOAL):
+            # Search the distances to the goal blocks, spread over several ticks if the decision budget runs out
+            drop_off = self.get_next_drop_off()
+            if drop_off is not None and not self.settings["colourblind"]:
+                goal_locations = [block["location"] for block in self.found_goal_blocks.candidates(drop_off)]
+                if not self.decision_budget.prepare_distances(goal_locations):
+                    # Move towards the closest goal block found so far and continue choosing in the next tick
+                    return self.decision_budget.move_towards_closest_known(goal_locations)
+
             # Get closest goal
             goal_block, distance = self.goal_dropper.find_goal_block(self.agent_id)
 
@@ -281,17 +296,26 @@ class Group58Agent(BW4TBrain):
                 self.phase = Phase.CHOOSE_ROOM
                 return None, {}
 
-            # Check if we are the closest agent (with phase CHOOSE_GOAL) to the goal block
-            if self.goal_dropper.grab_conflict(goal_block, distance):
+            if self.settings.get("optimal_allocation", False):
+                # Take the goal block assigned to us by the optimal assignment of the agents we see choosing a goal.
+                # Other agents may trust other senders or see other agents, so the closest agent still wins a block
+                # we both want
+                goal_block, distance = self.goal_dropper.allocate_goal_block()
+                conflict = goal_block is None or self.goal_dropper.grab_conflict(goal_block, distance)
+            else:
+                # Check if we are the closest agent (with phase CHOOSE_GOAL) to the goal block
+                conflict = self.goal_dropper.grab_conflict(goal_block, distance)
+
+            if conflict:
                 # Continue with phase CHOOSE_GOAL
                 return None, {}
             else:
                 # Mark drop goal as grabbed
                 drop_off = self.get_next_drop_off()
-                drop_off["grabbed"] = True
+                drop_off.grabbed = True
 
-                goal_block["drop_off_n"] = drop_off["n"]
-                goal_block["drop_off_location"] = self.drop_offs[goal_block["drop_off_n"]]["location"]
+                goal_block["drop_off_n"] = drop_off.n
+                goal_block["drop_off_location"] = self.drop_offs[goal_block["drop_off_n"]].location
                 self._chosen_goal_blocks.append(goal_block)
 
                 self.phase = Phase.GRAB_GOAL
@@ -308,12 +332,7 @@ class Group58Agent(BW4TBrain):
             goal_block = self._chosen_goal_blocks[-1]
 
             # Check if someone picked up the goal block
-            picked_up = True
-            for found_goal_block in self.found_goal_blocks:
-                if goal_block["location"] == found_goal_block["location"]:
-                    picked_up = False
-                    break
-            if picked_up:
+            if not self.found_goal_blocks.has_block_at(goal_block["location"]):
                 del self._chosen_goal_blocks[-1]
                 self.phase = Phase.CHOOSE_GOAL
                 return None, {}
@@ -321,11 +340,7 @@ class Group58Agent(BW4TBrain):
             if is_on_location(self, goal_block["location"]):
 
                 # Remove grabbed block from found goal blocks
-                found_goal_blocks = []
-                for old_block in self.found_goal_blocks:
-                    if old_block["location"] != goal_block["location"]:
-                        found_goal_blocks.append(old_block)
-                self.found_goal_blocks = found_goal_blocks
+                self.found_goal_blocks.remove_at(goal_block["location"])
 
                 # Get block with obj_id
                 block = self.goal_dropper.get_block_info(goal_block)
@@ -359,15 +374,10 @@ class Group58Agent(BW4TBrain):
                         # Are we going to lazy/lie skip during the drop off
                         self.skip_drop_off = self.lazy_skip() or self.lie()
                         # Store path length to drop off location
-                        self._path_length_drop_off \
-                            = len(path(self.agent_id, self.state, self.location, goal_block["drop_off_location"]))
+                        self._path_length_drop_off = path_length(self, self.location, goal_block["drop_off_location"])
 
                     # Remove grabbed block from found goal blocks
-                    found_goal_blocks = []
-                    for old_block in self.found_goal_blocks:
-                        if old_block["location"] != goal_block["location"]:
-                            found_goal_blocks.append(old_block)
-                    self.found_goal_blocks = found_goal_blocks
+                    self.found_goal_blocks.remove_at(goal_block["location"])
 
                     # Grab block
                     return GrabObject.__name__, {"object_id": goal_block["obj_id"]}
@@ -379,13 +389,13 @@ class Group58Agent(BW4TBrain):
                     # Tell others that we found a block
                     goal_block["found_by"] = self.agent_id
                     self.msg_handler.send_found_goal_block(goal_block)
-                    self.found_goal_blocks.append(goal_block)
+                    self.found_goal_blocks.add(goal_block)
 
                     del self._chosen_goal_blocks[-1]
                     # Block is not there, find another goal
                     self.phase = Phase.CHOOSE_GOAL
                     # Reset grabbed
-                    self.drop_offs[goal_block["drop_off_n"]]["grabbed"] = False
+                    self.drop_offs[goal_block["drop_off_n"]].grabbed = False
                     return None, {}
             else:
                 return move_to(self, goal_block["location"])
@@ -396,17 +406,17 @@ class Group58Agent(BW4TBrain):
             goal_block = self._chosen_goal_blocks[0]
 
             # Check if someone grabbed/delivered the block before us
-            if self.drop_offs[goal_block["drop_off_n"]]["delivered"]:
+            if self.drop_offs[goal_block["drop_off_n"]].delivered:
                 # Make sure we do not drop on top of another block
                 if self.goal_dropper.get_block_info({"location": self.location}) is None:
                     # Make sure that we are not on a drop off zone
                     for drop_off in self.drop_offs:
-                        if drop_off["n"] != goal_block["drop_off_n"] and is_on_location(self, drop_off["location"]):
+                        if drop_off.n != goal_block["drop_off_n"] and is_on_location(self, drop_off.location):
                             return move_to(self, (2, 2))
 
                     goal_block["found_by"] = self.agent_id
                     goal_block["location"] = self.location
-                    self.found_goal_blocks.append(goal_block)
+                    self.found_goal_blocks.add(goal_block)
                     # Inform other agents that we dropped the goal block
                     self.msg_handler.send_drop_goal_block(
                         goal_block,
@@ -424,14 +434,14 @@ class Group58Agent(BW4TBrain):
 
             if is_on_location(self, goal_block["drop_off_location"]):
                 # Check if we are first drop off or previous drop off was delivered
-                if goal_block["drop_off_n"] == 0 or self.drop_offs[goal_block["drop_off_n"] - 1]["delivered"]:
+                if goal_block["drop_off_n"] == 0 or self.drop_offs[goal_block["drop_off_n"] - 1].delivered:
                     self._chosen_goal_blocks.pop(0)
 
                     # Next phase is looking for another goal
                     self.phase = Phase.CHOOSE_GOAL
 
                     # Mark drop off as delivered
-                    self.drop_offs[goal_block["drop_off_n"]]["delivered"] = True
+                    self.drop_offs[goal_block["drop_off_n"]].delivered = True
 
                     # Check if goal was already dropped of
                     if self.goal_dropper.get_block_info({"location": self.location}) is None:
@@ -450,12 +460,12 @@ class Group58Agent(BW4TBrain):
 
                 # We skip drop off if we are halfway through the path
                 if self.skip_drop_off \
-                        and len(path(self.agent_id, self.state, self.location, goal_block["drop_off_location"])) \
+                        and path_length(self, self.location, goal_block["drop_off_location"]) \
                         / self._path_length_drop_off < 0.5:
 
                     # Make sure that we are not on another drop off location
                     for drop_off in self.drop_offs:
-                        if drop_off["n"] != goal_block["drop_off_n"] and is_on_location(self, drop_off["location"]):
+                        if drop_off.n != goal_block["drop_off_n"] and is_on_location(self, drop_off.location):
                             return move_to(self, goal_block["drop_off_location"])
 
                     # Make sure that we are not on another block
@@ -465,8 +475,8 @@ class Group58Agent(BW4TBrain):
                     # Add dropped goal blocks to found goal blocks
                     goal_block["location"] = self.location
                     goal_block["found_by"] = self.agent_id
-                    self.found_goal_blocks.append(goal_block)
-                    self.drop_offs[goal_block["drop_off_n"]]["grabbed"] = False
+                    self.found_goal_blocks.add(goal_block)
+                    self.drop_offs[goal_block["drop_off_n"]].grabbed = False
                     self._chosen_goal_blocks.pop(0)
 
                     # Next phase is room search
@@ -0,0 +1,145 @@
+from Group58Agent.PhaseHandler import Phase
+
+# Status flags of a drop off
+DELIVERED = 1
+GRABBED = 2
+
+
+class DropOff:
+    __slots__ = ("n", "colour", "shape", "size", "location", "status")
+
+    def __init__(self, n, colour, shape, size, location):
+        self.n = n
+        self.colour = colour
+        self.shape = shape
+        self.size = size
+        self.location = location
+        self.status = 0
+
+    @property
+    def delivered(self):
+        return bool(self.status & DELIVERED)
+
+    @delivered.setter
+    def delivered(self, value):
+        self._set_flag(DELIVERED, value)
+
+    @property
+    def grabbed(self):
+        return bool(self.status & GRABBED)
+
+    @grabbed.setter
+    def grabbed(self, value):
+        self._set_flag(GRABBED, value)
+
+    def _set_flag(self, flag, value):
+        if value:
+            self.status |= flag
+        else:
+            self.status &= ~flag
+
+
+class Room:
+    __slots__ = ("room_name", "location", "obj_id", "size", "visited", "last_agent_id", "visited_by_me")
+
+    def __init__(self, room_name, location, obj_id, size=None):
+        self.room_name = room_name
+        # Location in front of the door
+        self.location = location
+        self.obj_id = obj_id
+        # (width, height) of the room including its walls, None if unknown
+        self.size = size
+        self.visited = False
+        self.last_agent_id = None
+        self.visited_by_me = False
+
+
+class OtherAgent:
+    __slots__ = ("agent_id", "agent_idx", "location", "phase")
+
+    def __init__(self, agent_id, agent_idx):
+        self.agent_id = agent_id
+        self.agent_idx = agent_idx
+        self.location = (1, 1)
+        self.phase = Phase.CHOOSE_ROOM
+
+
+class DropOffs:
+    def __init__(self):
+        # Drop offs in the order they have to be delivered, a drop off is at index n
+        self._drop_offs = []
+        self._by_location = {}
+
+    def __len__(self):
+        return len(self._drop_offs)
+
+    def __iter__(self):
+        return iter(self._drop_offs)
+
+    def __getitem__(self, n):
+        return self._drop_offs[n]
+
+    # Add the next drop off
+    def add(self, colour, shape, size, location):
+        drop_off = DropOff(len(self._drop_offs), colour, shape, size, location)
+        self._drop_offs.append(drop_off)
+        self._by_location.setdefault(tuple(location), []).append(drop_off)
+        return drop_off
+
+    # Returns the drop offs at a location
+    def at(self, location):
+        return self._by_location.get(tuple(location), [])
+
+    # Returns the first drop off that has none of the status flags set, None if there is none
+    def first_without(self, flags):
+        for drop_off in self._drop_offs:
+            if not drop_off.status & flags:
+                return drop_off
+        return None
+
+
+class Rooms:
+    def __init__(self):
+        self._rooms = []
+        self._by_name = {}
+
+    def __len__(self):
+        return len(self._rooms)
+
+    def __iter__(self):
+        return iter(self._rooms)
+
+    # Add a room
+    def add(self, room_name, location, obj_id, size=None):
+        room = Room(room_name, location, obj_id, size)
+        self._rooms.append(room)
+        self._by_name.setdefault(room_name, room)
+        return room
+
+    # Returns a room from a room name, None if there is no such room
+    def get(self, room_name):
+        return self._by_name.get(room_name)
+
+
+class OtherAgents:
+    def __init__(self):
+        # Agents in the order of their agent_idx
+        self._agents = []
+        self._by_id = {}
+
+    def __len__(self):
+        return len(self._agents)
+
+    def __iter__(self):
+        return iter(self._agents)
+
+    # Add an agent
+    def add(self, agent_id, agent_idx):
+        other_agent = OtherAgent(agent_id, agent_idx)
+        self._agents.append(other_agent)
+        self._by_id[agent_id] = other_agent
+        return other_agent
+
+    # Returns an agent from an agent id, None if it is not a team member
+    def get(self, agent_id):
+        return self._by_id.get(agent_id)
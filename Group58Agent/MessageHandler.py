@@ -1,4 +1,4 @@
-import json
+import enum
 
 from matrx.messages import Message
 from Group58Agent.PhaseHandler import Phase
@@ -7,19 +7,38 @@ from Group58Agent.PhaseHandler import Phase
 class MessageHandler:
     def __init__(self, agent):
         self.agent = agent
-
-    def _send(self, msg):
-        msg = Message(content=msg, from_id=self.agent.agent_id)
-        if msg.content not in self.agent.received_messages:
-            self.agent.send_message(msg)
+        # Keys of the knowledge messages read in the last read_messages, used to not repeat what we just received
+        self._received_keys = set()
+        # Last version of the team blackboard that we read
+        self._blackboard_version = 0
+        # Which process function handles each kind of message
+        self._handlers = {
+            MessageKind.MOVING_TO: self._process_move_to,
+            MessageKind.OPENING_DOOR: self._process_opening_door,
+            MessageKind.SEARCHING: self._process_searching,
+            MessageKind.FOUND_GOAL_BLOCK: self._process_found_goal_block,
+            MessageKind.PICKUP_GOAL_BLOCK: self._process_pickup_goal_block,
+            MessageKind.DROP_GOAL_BLOCK: self._process_drop_goal_block,
+            MessageKind.DECREASE_TRUST: self._process_decrease_trust_value,
+        }
+
+    def _send(self, content, kind, payload):
+        with self.agent.profile("send_messages"):
+            if _key(kind, payload) in self._received_keys:
+                return
+            if self.agent.blackboard is not None:
+                # Post the knowledge on the team blackboard instead of sending it to every agent
+                self.agent.blackboard.post(self.agent.state["World"]["nr_ticks"], self.agent.agent_id, kind, payload)
+            else:
+                self.agent.send_message(TeamMessage(content=content, from_id=self.agent.agent_id, kind=kind,
+                                                    payload=payload))
 
     # Update the phase of the other agent in our agent array
     def _update_other_agent_phase(self, agent_id, phase):
         # Update sender agent phase
-        for other_agent in self.agent.other_agents:
-            if other_agent["agent_id"] == agent_id:
-                other_agent["phase"] = phase
-                break
+        other_agent = self.agent.other_agents.get(agent_id)
+        if other_agent is not None:
+            other_agent.phase = phase
 
     # What to update when receiving a move to message
     def _process_move_to(self, msg):
@@ -27,10 +46,9 @@ class MessageHandler:
         self._update_other_agent_phase(msg.from_id, Phase.GO_TO_ROOM)
 
         # Mark room as visited
-        room_name = msg.content.replace("Moving to ", "")
-        room = self.agent.get_room(room_name)
-        room["visited"] = True
-        room["last_visited_id"] = msg.from_id
+        room = self.agent.get_room(msg.payload["room_name"])
+        room.visited = True
+        room.last_agent_id = msg.from_id
 
     # What to update when receiving a open door message
     def _process_opening_door(self, msg):
@@ -47,120 +65,89 @@ class MessageHandler:
         # Update sender agent phase
         self._update_other_agent_phase(msg.from_id, Phase.CHOOSE_GOAL)
 
-        # Parse message content
-        goal_block = json.loads(
-            msg.content[msg.content.index("{"): msg.content.index("}") + 1]
-        )
-        location = json.loads(
-            "[" + msg.content[msg.content.index("(") + 1: msg.content.index(")")] + "]"
-        )
-        goal_block["location"] = (location[0], location[1])
+        goal_block = _goal_block_from_payload(msg.payload)
         goal_block["found_by"] = msg.from_id
         # Add goal block to our agent's goal blocks
         if  msg.from_id != self.agent.agent_id and \
             self.agent.trust_model.can_trust_found_goal(msg.from_id) and \
             goal_block not in self.agent.found_goal_blocks:
-            self.agent.found_goal_blocks.append(goal_block)
+            self.agent.found_goal_blocks.add(goal_block)
 
     # What to update when receiving a pickup block message
     def _process_pickup_goal_block(self, msg):
         # Update sender agent phase
         self._update_other_agent_phase(msg.from_id, Phase.GRAB_GOAL)
 
-        # Parse message content
-        goal_block = json.loads(
-            msg.content[msg.content.index("{"): msg.content.index("}") + 1]
-        )
-        location = json.loads(
-            "[" + msg.content[msg.content.index("(") + 1: msg.content.index(")")] + "]"
-        )
-        goal_block["location"] = (location[0], location[1])
+        goal_block = _goal_block_from_payload(msg.payload)
 
         # Remove grabbed block from found goal blocks
-        found_goal_blocks = []
-        for old_block in self.agent.found_goal_blocks:
-            if old_block["location"] != goal_block["location"]:
-                found_goal_blocks.append(old_block)
-        self.agent.found_goal_blocks = found_goal_blocks
+        self.agent.found_goal_blocks.remove_at(goal_block["location"])
 
         # Update drop off as grabbed
         next_drop_off = self.agent.get_next_drop_off()
         if  msg.from_id != self.agent.agent_id and \
             self.agent.trust_model.can_trust_drop_off(msg.from_id) and \
             next_drop_off is not None:
-            next_drop_off["grabbed"] = True
+            next_drop_off.grabbed = True
 
     # What to update when receiving a drop block message
     def _process_drop_goal_block(self, msg):
         # Update sender agent phase
         self._update_other_agent_phase(msg.from_id, Phase.CHOOSE_GOAL)
 
-        # Parse message content
-        goal_block = json.loads(
-            msg.content[msg.content.index("{"): msg.content.index("}") + 1]
-        )
-        location = json.loads(
-            "[" + msg.content[msg.content.index("(") + 1: msg.content.index(")")] + "]"
-        )
-        drop_off_location = (location[0], location[1])
+        goal_block = _goal_block_from_payload(msg.payload)
+        drop_off_location = goal_block["location"]
 
-        for drop_off in self.agent.drop_offs:
-            if drop_off["location"] == drop_off_location:
-                drop_off["delivered"] = True
-                self.agent.trust_model.increase_drop_off(msg.from_id)
-                return
+        for drop_off in self.agent.drop_offs.at(drop_off_location):
+            drop_off.delivered = True
+            self.agent.trust_model.increase_drop_off(msg.from_id)
+            return
 
         # If we are here then the dropped block is not delivered
         # Add dropped goal blocks to found goal blocks
-        goal_block["location"] = drop_off_location
         goal_block["found_by"] = msg.from_id
         # Check if the block is a goal block
         for drop_off in self.agent.drop_offs:
-            if goal_block["colour"] == drop_off["colour"] and goal_block["shape"] == drop_off["shape"]:
-                self.agent.found_goal_blocks.append(goal_block)
+            if goal_block["colour"] == drop_off.colour and goal_block["shape"] == drop_off.shape:
+                self.agent.found_goal_blocks.add(goal_block)
                 self.agent.trust_model.decrease_drop_off(msg.from_id)
         # Undo all undelivered grabbed drop offs since we do not know for which drop off the block was mis-dropped
         for drop_off in self.agent.drop_offs:
-            if not drop_off["delivered"] and drop_off["grabbed"]:
-                drop_off["grabbed"] = False
+            if not drop_off.delivered and drop_off.grabbed:
+                drop_off.grabbed = False
 
     #What to update when receiving a decrease trust message
     def _process_decrease_trust_value(self, msg):
-        trust = json.loads(
-            msg.content[msg.content.index("{"): msg.content.index("}") + 1]
-        )
         if self.agent.trust_model._can_trust_overall(msg.from_id):
-            self.agent.trust_model._update_trust(trust["agent"], trust["action"], -1.0)
+            self.agent.trust_model._update_trust(msg.payload["agent"], msg.payload["action"], -1.0)
 
-    # Go over received messages and perform updates
+    # Go over received messages and the new blackboard entries and perform updates
     def read_messages(self):
-        for msg in self.agent.received_messages:
-            if msg.from_id != self.agent.agent_id:
-                if "Moving to" in msg.content:
-                    self._process_move_to(msg)
-                elif "Opening door of" in msg.content:
-                    self._process_opening_door(msg)
-                elif "Searching through" in msg.content:
-                    self._process_searching(msg)
-                elif "Found goal block" in msg.content:
-                    self._process_found_goal_block(msg)
-                elif "Picking up goal block" in msg.content:
-                    self._process_pickup_goal_block(msg)
-                elif "Dropped goal block" in msg.content:
-                    self._process_drop_goal_block(msg)
-                elif "Decrease trust" in msg.content:
-                    self._process_decrease_trust_value(msg)
+        messages = self.agent.received_messages
+        if self.agent.blackboard is not None:
+            entries, self._blackboard_version = self.agent.blackboard.read(self._blackboard_version,
+                                                                           self.agent.state["World"]["nr_ticks"])
+            messages = entries + messages
+        # Keep the keys until the next read, so the messages we send after reading do not repeat them
+        self._received_keys = set()
+        for msg in messages:
+            # Messages that are not sent by a MessageHandler have no kind and are ignored
+            handler = self._handlers.get(getattr(msg, "kind", None))
+            if handler is not None and msg.from_id != self.agent.agent_id:
+                if msg.kind in KNOWLEDGE_KINDS:
+                    self._received_keys.add(msg.key())
+                handler(msg)
         # Delete messages
         self.agent.received_messages = []
 
     def send_moving_to_room(self, room_name):
-        self._send("Moving to " + room_name)
+        self._send("Moving to " + room_name, MessageKind.MOVING_TO, {"room_name": room_name})
 
     def send_opening_door(self, room_name):
-        self._send("Opening door of " + room_name)
+        self._send("Opening door of " + room_name, MessageKind.OPENING_DOOR, {"room_name": room_name})
 
     def send_searching_room(self, room_name):
-        self._send("Searching through " + room_name)
+        self._send("Searching through " + room_name, MessageKind.SEARCHING, {"room_name": room_name})
 
     def send_found_goal_block(self, goal_block):
         self._send(
@@ -171,7 +158,9 @@ class MessageHandler:
             + ', "colour": "'
             + goal_block["colour"]
             + '"} at location '
-            + str(goal_block["location"])
+            + str(goal_block["location"]),
+            MessageKind.FOUND_GOAL_BLOCK,
+            _goal_block_payload(goal_block, goal_block["location"])
         )
 
     def send_pickup_goal_block(self, goal_block):
@@ -183,7 +172,9 @@ class MessageHandler:
             + ', "colour": "'
             + goal_block["colour"]
             + '"} at location '
-            + str(goal_block["location"])
+            + str(goal_block["location"]),
+            MessageKind.PICKUP_GOAL_BLOCK,
+            _goal_block_payload(goal_block, goal_block["location"])
         )
 
     def send_drop_goal_block(self, goal_block, drop_off_location):
@@ -195,7 +186,9 @@ class MessageHandler:
             + ', "colour": "'
             + goal_block["colour"]
             + '"} at location '
-            + str(drop_off_location)
+            + str(drop_off_location),
+            MessageKind.DROP_GOAL_BLOCK,
+            _goal_block_payload(goal_block, drop_off_location)
         )
 
     def send_decrease_trust_value(self, agent, action):
@@ -204,5 +197,56 @@ class MessageHandler:
             + str(agent)
             + '", "action": "'
             + str(action)
-            + '"}'
+            + '"}',
+            MessageKind.DECREASE_TRUST,
+            {"agent": str(agent), "action": str(action)}
         )
+
+
+class MessageKind(enum.IntEnum):
+    MOVING_TO = 1
+    OPENING_DOOR = 2
+    SEARCHING = 3
+    FOUND_GOAL_BLOCK = 4
+    PICKUP_GOAL_BLOCK = 5
+    DROP_GOAL_BLOCK = 6
+    DECREASE_TRUST = 7
+
+
+# Kinds of messages with knowledge of the world that any agent could send. An agent does not send these when it just
+# received the same knowledge. The other kinds are about the sender itself, eg. its phase or its trust in an agent,
+# so they are always sent.
+KNOWLEDGE_KINDS = frozenset({MessageKind.FOUND_GOAL_BLOCK})
+
+
+class TeamMessage(Message):
+    """
+    A message with a human readable content, and a kind and payload dict
+    that are read by the MessageHandler of the receiving agents.
+    """
+
+    def __init__(self, content, from_id, kind, payload, to_id=None):
+        super().__init__(content=content, from_id=from_id, to_id=to_id)
+        self.kind = kind
+        self.payload = payload
+
+    # Hashable key of the kind and payload of this message
+    def key(self):
+        return _key(self.kind, self.payload)
+
+
+# Returns a hashable key of the kind and payload of a message or blackboard entry
+def _key(kind, payload):
+    return kind, tuple(sorted(payload.items()))
+
+
+# Returns the payload describing a goal block at a location
+def _goal_block_payload(goal_block, location):
+    return {"size": goal_block["size"], "shape": goal_block["shape"], "colour": goal_block["colour"],
+            "location": (location[0], location[1])}
+
+
+# Returns a new goal block dict from a goal block payload
+def _goal_block_from_payload(payload):
+    return {"size": payload["size"], "shape": payload["shape"], "colour": payload["colour"],
+            "location": (payload["location"][0], payload["location"][1])}
@@ -0,0 +1,62 @@
+from matrx.agents.agent_utils.navigator import AStarPlanner, get_move_actions
+
+
+class PathFollower:
+    def __init__(self, agent):
+        self.agent = agent
+        self._planner = None
+        # Move action names keyed by their (dx, dy)
+        self._move_actions = {}
+        self._target = None
+        # The planned locations from the last location of our agent up to the target
+        self._route = []
+        # The door version of the distance oracle the route was planned with
+        self._doors_version = None
+        # Number of planned routes and number of moves that followed an earlier route instead of planning a new one
+        self.nr_plans = 0
+        self.nr_avoided_plans = 0
+
+    # Returns the move action towards the target, a new route is only planned if the target changed,
+    # our agent left the route or the next step of the route is blocked
+    def move_to(self, target):
+        target = tuple(target)
+        location = tuple(self.agent.state[self.agent.agent_id]["location"])
+        # We are already there
+        if location == target:
+            return None
+
+        if target == self._target and self._follow_route(location):
+            self.nr_avoided_plans += 1
+        else:
+            self._plan_route(location, target)
+
+        # No route to the target was found
+        if len(self._route) < 2:
+            return None
+        return self._move_actions[(self._route[1][0] - location[0], self._route[1][1] - location[1])]
+
+    # Moves the route along with our agent, returns False if the route can not be followed anymore
+    def _follow_route(self, location):
+        # Our agent stays on the start of the route if its last move did not happen (yet)
+        if location not in self._route[:2]:
+            return False
+        self._route = self._route[self._route.index(location):]
+
+        # A door was opened or closed since the route was planned, so a shorter route may exist
+        if self.agent.distance_oracle.get_doors_version() != self._doors_version:
+            return False
+        return len(self._route) >= 2 and self.agent.distance_oracle.is_traversable(self._route[1])
+
+    # Plans a new route with A* over the occupation map of the distance oracle
+    def _plan_route(self, location, target):
+        with self.agent.profile("path_replan"):
+            if self._planner is None:
+                self._planner = AStarPlanner(self.agent.action_set)
+                for action_name, delta in get_move_actions(self.agent.action_set).items():
+                    self._move_actions[delta] = action_name
+            path = self._planner.plan(location, target, self.agent.distance_oracle.get_occupation_map())
+        self.nr_plans += 1
+        self._target = target
+        self._doors_version = self.agent.distance_oracle.get_doors_version()
+        # A* returns only the start location if there is no path
+        self._route = [location] + [tuple(loc) for loc in path if tuple(loc) != location]
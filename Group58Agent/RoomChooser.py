@@ -1,32 +1,27 @@
 import numpy as np
 
-from Group58Agent.util import path
+from Group58Agent.Allocation import hungarian
+from Group58Agent.DistanceMatrix import DistanceMatrix
+from Group58Agent.PhaseHandler import Phase
+from Group58Agent.util import agents_in_phase
 
 
 class RoomChooser:
     def __init__(self, agent):
         self.agent = agent
+        self._distances = DistanceMatrix(agent)
 
     # Returns closest non-visited room and distance
     def choose_room(self, agent_id):
-        unvisited = self._get_unvisited_rooms()
+        unvisited = self.get_candidate_rooms()
 
         if len(unvisited) == 0:
-            # Look inside rooms not visited by us
-            unvisited = self._get_unvisited_by_me()
-            if len(unvisited) == 0:
-                # All rooms were visited by us
-                return None, None
+            # All rooms were visited by us
+            return None, None
         # order rooms by distance
-        distances = []
-        for room in unvisited:
-            start_location = self.agent.state[agent_id]["location"]
-            target_location = room["location"]
-            distances.append(
-                len(path(agent_id, self.agent.state, start_location, target_location))
-            )
-        idx = np.argsort(distances)
-        return np.array(unvisited)[idx][0], np.array(distances)[idx][0]
+        distances = self._distances.get(agent_id, [room.location for room in unvisited])
+        idx = np.argsort(distances)[0]
+        return unvisited[idx], distances[idx]
 
     # Returns true if another agent chose this room and is closer to it
     def room_conflict(self, room, distance):
@@ -34,14 +29,14 @@ class RoomChooser:
         # In case of draw choose smallest agent_idx
         for other_agent in self.agent.other_agents:
             if (
-                other_agent["phase"] == "CHOOSE_ROOM"
-                and other_agent["location"] is not None
+                other_agent.phase == Phase.CHOOSE_ROOM
+                and other_agent.location is not None
             ):
-                other_room, other_distance = self.choose_room(other_agent["agent_id"])
-                if room["room_name"] == other_room["room_name"]:
+                other_room, other_distance = self.choose_room(other_agent.agent_id)
+                if room.room_name == other_room.room_name:
                     if distance == other_distance:
                         # choose agent with lowest idx
-                        if self.agent.agent_idx > other_agent["agent_idx"]:
+                        if self.agent.agent_idx > other_agent.agent_idx:
                             return True
                     else:
                         # choose smallest distance
@@ -49,11 +44,32 @@ class RoomChooser:
                             return True
         return False
 
+    # Returns the room assigned to us and distance when the agents we see choosing a room are assigned a different
+    # room with the smallest total distance, (None, None) if we are not assigned a room
+    def allocate_room(self):
+        rooms = self.get_candidate_rooms()
+        locations = [room.location for room in rooms]
+        agent_ids = agents_in_phase(self.agent, Phase.CHOOSE_ROOM)
+        distances = [self._distances.get(agent_id, locations) for agent_id in agent_ids]
+        row = agent_ids.index(self.agent.agent_id)
+        idx = hungarian(distances)[row]
+        if idx < 0:
+            return None, None
+        return rooms[idx], distances[row][idx]
+
+    # Returns the rooms we can choose from: the unvisited rooms, or else the rooms not visited by us
+    def get_candidate_rooms(self):
+        unvisited = self._get_unvisited_rooms()
+        if len(unvisited) == 0:
+            # Look inside rooms not visited by us
+            unvisited = self._get_unvisited_by_me()
+        return unvisited
+
     # Returns all rooms that have not been visited
     def _get_unvisited_rooms(self):
         unvisited = []
         for room in self.agent.rooms:
-            if not room["visited"]:
+            if not room.visited:
                 unvisited.append(room)
         return unvisited
 
@@ -61,7 +77,7 @@ class RoomChooser:
     def _get_unvisited_by_me(self):
         unvisited = []
         for room in self.agent.rooms:
-            if not room["visited_by_me"]:
+            if not room.visited_by_me:
                 unvisited.append(room)
         return unvisited
 
@@ -69,6 +85,6 @@ class RoomChooser:
     def all_rooms_visited(self):
         visited_n = 0
         for room in self.agent.rooms:
-            if room["visited"]:
+            if room.visited:
                 visited_n += 1
         return visited_n == len(self.agent.rooms)
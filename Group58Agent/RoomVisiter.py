@@ -1,5 +1,67 @@
+import numpy as np
+
 from Group58Agent.PhaseHandler import Phase
 from Group58Agent.util import move_to, is_on_location
+from bw4t.BW4TWorld import DEFAULT_WORLDSETTINGS
+
+
+# Returns the lane coordinates between low and high (inclusive) so that every coordinate is within reach of a lane
+def sweep_lanes(low, high, reach):
+    lanes = []
+    lane = low + reach
+    while True:
+        # The last lane is moved back so that it stays inside the room
+        lanes.append(min(lane, max(high - reach, low)))
+        if lanes[-1] + reach >= high:
+            return lanes
+        lane += 2 * reach + 1
+
+
+# Returns the sweep plan of the room with the given location (the tile in front of its door):
+# the tile in front of the door, the door, the tile behind the door and then the ends of the lanes to walk through,
+# so that the agent sees every tile of the room within the sense range
+def sweep_plan(location, room_size, sense_range):
+    width, height = room_size
+    # The door is always in the center of the bottom wall of the room
+    door = (location[0], location[1] - 1)
+    entry = (door[0], door[1] - 1)
+    left = door[0] - int(np.ceil(width / 2)) + 1
+    right = left + width - 3
+    top = door[1] - height + 2
+    bottom = door[1] - 1
+    reach = int(min(sense_range, max(width, height)))
+    # The whole room is seen from behind the door when both top corners are in range,
+    # agents sense the objects within the euclidean distance of the sense range
+    if max(entry[0] - left, right - entry[0]) ** 2 + (entry[1] - top) ** 2 <= reach ** 2:
+        return [location, door, entry]
+
+    # Vertical lanes walk from the bottom to the top of the room (or back), horizontal lanes from left to right
+    lanes = [[((x, bottom), (x, top)) for x in sweep_lanes(left, right, reach)],
+             [((left, y), (right, y)) for y in sweep_lanes(top, bottom, reach)]]
+
+    best_tour, best_length = None, (np.inf, np.inf)
+    for lane_ends in lanes:
+        for ordered in (lane_ends, lane_ends[::-1]):
+            tour, length = [entry], (0, 0)
+            for end_a, end_b in ordered:
+                # Enter every lane at the end nearest to the agent
+                if _distance(tour[-1], end_b) < _distance(tour[-1], end_a):
+                    end_a, end_b = end_b, end_a
+                for end in (end_a, end_b):
+                    moves, straight_moves = _distance(tour[-1], end)
+                    length = (length[0] + moves, length[1] + straight_moves)
+                    if end != tour[-1]:
+                        tour.append(end)
+            if length < best_length:
+                best_tour, best_length = tour, length
+    return [location, door] + best_tour
+
+
+# Returns the number of moves between two locations, as agents can move diagonally,
+# and the manhattan distance to prefer straight moves between plans with the same number of moves
+def _distance(location_a, location_b):
+    dx, dy = abs(location_a[0] - location_b[0]), abs(location_a[1] - location_b[1])
+    return max(dx, dy), dx + dy
 
 
 class RoomVisiter:
@@ -7,40 +69,62 @@ class RoomVisiter:
         self.agent = agent
         self.found_goal_blocks = []
         self._skipped = False
+        # Sweep plans by room name, rooms do not move so each plan is only generated once
+        self._plans = {}
+        self._plan = None
+        self._waypoint_idx = 0
+
+    # Starts the visit of a room by following the sweep plan of the room
+    def _start_visit(self, room):
+        if room.room_name not in self._plans:
+            # The size of the room in the running world, the default size if the world did not tell
+            size = room.size if room.size is not None else DEFAULT_WORLDSETTINGS["room_size"]
+            self._plans[room.room_name] = sweep_plan(room.location, size, self._get_block_sense_range())
+        self._plan = self._plans[room.room_name]
+        self._waypoint_idx = 0
 
     def visit_room(self, room):
+        if self._plan is None:
+            self._start_visit(room)
+
+        # Blocks are also seen between the waypoints
+        self._update_room()
+        if is_on_location(self.agent, self._plan[self._waypoint_idx]):
+            if not self._skipped and self._waypoint_idx < len(self._plan) - 1:
+                # After entering the room check if lazy can skip room
+                if self._waypoint_idx == 2 and self.agent.skip_room_search:
+                    self._skipped = True
+                    # The search completes when the agent is back on the door
+                    self._waypoint_idx = 1
+                    return move_to(self.agent, self._plan[0])
+                self._waypoint_idx += 1
+            else:
+                # We completed the room search
+                self.agent.phase = Phase.CHOOSE_GOAL
+                # Send goal blocks locations to other agents
+                for goal_block in self.found_goal_blocks:
+                    # Add goal block to our agent's blocks
+                    if goal_block not in self.agent.found_goal_blocks:
+                        self.agent.found_goal_blocks.add(goal_block)
+                    self.agent.msg_handler.send_found_goal_block(goal_block)
+
+                # Reset temp variables
+                self.found_goal_blocks = []
+                self._skipped = False
+                location = self._plan[0]
+                self._plan = None
+                return move_to(self.agent, location)
+
+        if self._skipped:
+            return move_to(self.agent, self._plan[0])
+        return move_to(self.agent, self._plan[self._waypoint_idx])
 
-        locations = [room["location"],
-                     (room["location"][0], room["location"][1] - 1),
-                     (room["location"][0], room["location"][1] - 2),
-                     (room["location"][0], room["location"][1] - 3),
-                     (room["location"][0] - 1, room["location"][1] - 3),
-                     (room["location"][0] - 1, room["location"][1] - 2)]
-
-        for i, location in enumerate(locations):
-            if is_on_location(self.agent, location):
-                self._update_room()
-                if not self._skipped and i < len(locations) - 1:
-                    # After entering the room check if lazy can skip room
-                    if i == 2 and self.agent.skip_room_search:
-                        self._skipped = True
-                        return move_to(self.agent, locations[0])
-                    else:
-                        return move_to(self.agent, locations[i + 1])
-                else:
-                    # We completed the room search
-                    self.agent.phase = Phase.CHOOSE_GOAL
-                    # Send goal blocks locations to other agents
-                    for goal_block in self.found_goal_blocks:
-                        # Add goal block to our agent's blocks
-                        if goal_block not in self.agent.found_goal_blocks:
-                            self.agent.found_goal_blocks.append(goal_block)
-                        self.agent.msg_handler.send_found_goal_block(goal_block)
-
-                    # Reset temp variables
-                    self.found_goal_blocks = []
-                    self._skipped = False
-                    return move_to(self.agent, locations[0])
+    # Returns the range in which our agent sees blocks
+    def _get_block_sense_range(self):
+        for obj_type, sense_range in self.agent.sense_capability.get_capabilities().items():
+            if obj_type is not None and obj_type.__name__ == "CollectableBlock":
+                return sense_range
+        return DEFAULT_WORLDSETTINGS["block_sense_range"]
 
     # Update the goal blocks seen in agent range
     def _update_room(self):
@@ -53,8 +137,8 @@ class RoomVisiter:
                          "found_by": self.agent.agent_id}
                 # Check if the block is a goal block
                 for drop_off in self.agent.drop_offs:
-                    if (self.agent.settings["colourblind"] or block["colour"] == drop_off["colour"]) and block[
-                        "shape"] == drop_off["shape"]:
+                    if (self.agent.settings["colourblind"] or block["colour"] == drop_off.colour) and block[
+                        "shape"] == drop_off.shape:
                         if self.agent.settings["colourblind"]:
                             block["colour"] = ""
 
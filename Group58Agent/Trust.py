@@ -1,74 +1,73 @@
+import atexit
 import csv
 import os
+import weakref
 
 TRUST_FOLDER = "./trust/"
 TRUST_POINTS = {"drop_off": [5.0, -1.0, 1.0, 0.0], "room_search": [5.0, -1.0, 1.0, 0.0],
                 "found_goal": [5.0, -3.0, 3.0, 0.0]}
+# initial value, deacrease, increase, trust threshold
 
+# Number of ticks after which changed trust values are written to disk
+FLUSH_INTERVAL = 100
+
+# Trust models that may still hold unwritten changes, flushed when the interpreter exits
+_open_models = weakref.WeakSet()
 
-# initial value, deacrease, increase, trust threshold
 
 class Trust:
     def __init__(self, agent):
         self.agent = agent
         self.headers = ['agent_id', 'drop_off', 'room_search', 'found_goal']
         self.file = TRUST_FOLDER + str(agent.agent_id) + '.csv'
+        # Trust values keyed by (agent_id, action)
+        self._trust = {}
+        # Agent ids in the order of the rows of the trust file
+        self._agent_ids = []
+        self._dirty = False
+        self._last_flush_tick = 0
 
         if not os.path.exists(TRUST_FOLDER):
             os.makedirs(TRUST_FOLDER)
 
-        if not os.path.exists(self.file):
-            with open(self.file, 'w+', newline='') as file:
-                writer = csv.DictWriter(file, fieldnames=self.headers)
-                writer.writeheader()
-
-        agents = self._get_trust()
+        if os.path.exists(self.file):
+            self._read_trust()
+        else:
+            self._dirty = True
 
         # Check if all agents have a row in trust file
-        with open(self.file, 'a', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=self.headers)
+        for other_agent in self.agent.other_agents:
+            if other_agent.agent_id not in self._agent_ids:
+                self._agent_ids.append(other_agent.agent_id)
+                for action in TRUST_POINTS:
+                    self._trust[(other_agent.agent_id, action)] = TRUST_POINTS[action][0]
+                self._dirty = True
 
-            for other_agent in self.agent.other_agents:
-                if other_agent["agent_id"] not in [_agent["agent_id"] for _agent in agents]:
-                    writer.writerow({'agent_id': other_agent["agent_id"],
-                                     'drop_off': TRUST_POINTS['drop_off'][0],
-                                     'room_search': TRUST_POINTS['room_search'][0],
-                                     'found_goal': TRUST_POINTS['found_goal'][0]})
+        self.flush()
+        _open_models.add(self)
 
     # Returns true if we can trust an agent to perform a certain task
     def _can_trust(self, agent_id, action):
-        agents = self._get_trust()
-        for agent in agents:
-            if agent["agent_id"] == agent_id:
-                return TRUST_POINTS[action][3] < float(agent[action])
+        if (agent_id, action) in self._trust:
+            return TRUST_POINTS[action][3] < self._trust[(agent_id, action)]
 
     # Returns true if we can trust an agent overall
     def _can_trust_overall(self, agent_id):
-        agents = self._get_trust()
-        for agent in agents:
-            if agent["agent_id"] == agent_id:
-                avg = (float(agent['drop_off']) + float(agent['room_search']) + float(agent['found_goal'])) / 3
-                return avg > 0
+        if agent_id in self._agent_ids:
+            avg = (self._trust[(agent_id, 'drop_off')] + self._trust[(agent_id, 'room_search')]
+                   + self._trust[(agent_id, 'found_goal')]) / 3
+            return avg > 0
 
     # Update trust based on agent_id, action (header) and value
     def _update_trust(self, agent_id, action, value):
         if self.agent.agent_id == agent_id:
             return
-        agents = self._get_trust()
-        for agent in agents:
-            if agent["agent_id"] == agent_id:
-                agent[action] = str(float(agent[action]) + value)
-                break
-        # overwrite existing csv file
-        with open(self.file, 'w+', newline='') as file:
-            writer = csv.DictWriter(file, fieldnames=self.headers)
-            writer.writeheader()
-            writer.writerows(agents)
-
-    # Get trust as dictionary objects
-    def _get_trust(self):
-        agents = []
+        if (agent_id, action) in self._trust:
+            self._trust[(agent_id, action)] += value
+            self._dirty = True
 
+    # Read the trust file into the trust table
+    def _read_trust(self):
         with open(self.file, 'r') as file:
             csv_reader = csv.reader(file)
             next(csv_reader)  # skip headers
@@ -77,8 +76,31 @@ class Trust:
                 for i, column in enumerate(row):
                     agent[self.headers[i]] = column
 
-                agents.append(agent)
-        return agents
+                self._agent_ids.append(agent['agent_id'])
+                for action in TRUST_POINTS:
+                    self._trust[(agent['agent_id'], action)] = float(agent[action])
+
+    # Write the trust table to disk if it changed, replacing the old file atomically
+    def flush(self):
+        if not self._dirty:
+            return
+        tmp_file = self.file + '.tmp'
+        with open(tmp_file, 'w', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=self.headers)
+            writer.writeheader()
+            for agent_id in self._agent_ids:
+                row = {'agent_id': agent_id}
+                for action in TRUST_POINTS:
+                    row[action] = str(self._trust[(agent_id, action)])
+                writer.writerow(row)
+        os.replace(tmp_file, self.file)
+        self._dirty = False
+
+    # Flush changed trust values every FLUSH_INTERVAL ticks
+    def tick(self, nr_ticks):
+        if nr_ticks - self._last_flush_tick >= FLUSH_INTERVAL:
+            self._last_flush_tick = nr_ticks
+            self.flush()
 
     def can_trust_drop_off(self, agent_id):
         return self._can_trust(agent_id, "drop_off")
@@ -112,3 +134,10 @@ class Trust:
     # Increase room search trust
     def increase_room_search(self, agent_id):
         self._update_trust(agent_id, "room_search", TRUST_POINTS["room_search"][2])
+
+
+# Write all unflushed trust values before the interpreter exits
+@atexit.register
+def _flush_open_models():
+    for trust_model in list(_open_models):
+        trust_model.flush()
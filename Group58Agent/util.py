@@ -10,12 +10,35 @@ def path(agent_id, state, start_location, target_location):
     return navigator_temp.plan(start_location, target_location, occupation_map)
 
 
-# Get action for navigation
+# uses the agent's distance oracle to get the number of moves agent->target
+def path_length(agent, start_location, target_location):
+    with agent.profile("path_planning"):
+        return agent.distance_oracle.distance(start_location, target_location)
+
+
+# Returns the ids of our agent and the other agents in range with a phase, ordered by agent_idx
+def agents_in_phase(agent, phase):
+    agents = [(agent.agent_idx, agent.agent_id)]
+    for other_agent in agent.other_agents:
+        if other_agent.phase == phase and other_agent.location is not None:
+            agents.append((other_agent.agent_idx, other_agent.agent_id))
+    return [agent_id for _, agent_id in sorted(agents)]
+
+
+# Returns the (width, height) of a room including its walls from the locations of the area tiles inside it,
+# None if there are no tiles
+def room_size(tile_locations):
+    if not tile_locations:
+        return None
+    xs = [location[0] for location in tile_locations]
+    ys = [location[1] for location in tile_locations]
+    return max(xs) - min(xs) + 3, max(ys) - min(ys) + 3
+
+
+# Get action for navigation, the agent's path follower keeps its route while the location stays the same
 def move_to(agent, location):
-    agent.navigator.reset_full()
-    agent.navigator.add_waypoints([location])
-    agent.state_tracker.update(agent.state)
-    return agent.navigator.get_move_action(agent.state_tracker), {}
+    with agent.profile("path_planning"):
+        return agent.path_follower.move_to(location), {}
 
 
 # Returns True if the agent is on the coordinates of the location
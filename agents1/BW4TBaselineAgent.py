@@ -45,9 +45,8 @@ class BaseLineAgent(BW4TBrain):
         while True:
             if Phase.PLAN_PATH_TO_CLOSED_DOOR==self._phase:
                 self._navigator.reset_full()
-                closedDoors = [door for door in state.values()
-                    if 'class_inheritance' in door and 'Door' in door['class_inheritance'] and not door['is_open']]
-                if len(closedDoors)==0:
+                closedDoors = state.get_with_property({'class_inheritance':'Door', 'is_open':False})
+                if not closedDoors:
                     return None, {}
                 # Randomly pick a closed door
                 self._door = random.choice(closedDoors)
@@ -0,0 +1,226 @@
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Group58Agent.Group58Agent import Group58Agent
+from bw4t.BW4TWorld import BW4TWorld, DEFAULT_WORLDSETTINGS
+from bw4t.statistics import Statistics
+
+"""
+Runs headless BW4T worlds over a grid of world sizes and team compositions
+and writes ticks/sec, episode wall time, peak RSS and ticks to completion
+of every run to a json file.
+
+Run from the repository root:
+    python benchmarks/run_benchmarks.py -output bench.json
+and compare with an earlier result:
+    python benchmarks/run_benchmarks.py -output new.json -compare bench.json
+"""
+
+# The kinds of agents a team can be made of
+AGENT_KINDS = ["normal", "lazy", "liar", "colourblind", "strong"]
+
+# Team compositions, each a list with the kind of every Group58Agent in the team
+TEAMS = {
+    "normal_2": ["normal"] * 2,
+    "normal_4": ["normal"] * 4,
+    "mixed_4": ["lazy", "strong", "colourblind", "liar"],
+    "mixed_8": ["lazy", "strong", "colourblind", "liar"] * 2,
+}
+
+# The world settings that are varied, every combination is run
+GRID = {
+    "nr_rooms": [4, 9, 16],
+    "rooms_per_row": [2, 4],
+    "average_blocks_per_room": [2, 4],
+    "nr_blocks_needed": [3, 6],
+    "team": list(TEAMS.keys()),
+}
+
+# A small grid for a quick check
+QUICK_GRID = {
+    "nr_rooms": [4, 9],
+    "rooms_per_row": [3],
+    "average_blocks_per_room": [2],
+    "nr_blocks_needed": [3],
+    "team": ["normal_2", "mixed_4"],
+}
+
+
+def make_agents(team):
+    """
+    @return the agent specifications for BW4TWorld of a team composition
+    """
+    agents = []
+    for i, kind in enumerate(TEAMS[team]):
+        settings = {"color": "#FFFF00", "shape": 1}
+        for setting in AGENT_KINDS[1:]:
+            settings[setting] = kind == setting
+        agents.append({"name": kind + "_" + str(i), "botclass": Group58Agent, "settings": settings})
+    return agents
+
+
+def make_world_settings(config, seed, deadline):
+    """
+    @return headless world settings for a configuration of the grid
+    """
+    world_settings = DEFAULT_WORLDSETTINGS.copy()
+    world_settings.update({
+        "deadline": deadline,
+        "tick_duration": 0,
+        "random_seed": seed,
+        "matrx_paused": False,
+        "run_matrx_api": False,
+        "run_matrx_visualizer": False,
+        "only_completable": True,
+    })
+    for setting, value in config.items():
+        if setting != "team":
+            world_settings[setting] = value
+    return world_settings
+
+
+def run_benchmark(config, seed, deadline):
+    """
+    Runs one episode in a new temporary folder, so no logs or trust files are shared between runs.
+    Meant to run in its own process, so the peak RSS is that of this run only.
+    @return dict with the configuration, seed and measurements of the run
+    """
+    result = {**config, "seed": seed, "nr_agents": len(TEAMS[config["team"]])}
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        random.seed(seed)
+        try:
+            world = BW4TWorld(make_agents(config["team"]), make_world_settings(config, seed, deadline)).run()
+        except Exception as e:
+            # eg. less blocks were generated than are needed, the world can not be built
+            result["error"] = repr(e)
+            return result
+        statistics = Statistics(world.getLogger().getFileName())
+        success = statistics.isSucces() == "True"
+        ticks = world.getNrTicks()
+        result.update({
+            "success": success,
+            "ticks": ticks,
+            "ticks_to_completion": int(statistics.getLastTick()) if success else None,
+            "setup_time": world.getSetupTime(),
+            "run_time": world.getRunTime(),
+            "episode_time": world.getSetupTime() + world.getRunTime(),
+            "ticks_per_sec": ticks / world.getRunTime() if world.getRunTime() > 0 else None,
+            "peak_rss_kb": peak_rss_kb(),
+        })
+    return result
+
+
+def run_benchmark_args(args):
+    return run_benchmark(*args)
+
+
+def peak_rss_kb():
+    """
+    @return the peak resident set size of this process in KB, None if it can not be measured
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux KB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def grid_configs(grid):
+    """
+    @return list with a dict for every combination of the values in the grid
+    """
+    names = list(grid.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def git_commit():
+    """
+    @return the current git commit of the repository, None if unknown
+    """
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def config_key(result):
+    return tuple(result[name] for name in GRID) + (result["seed"],)
+
+
+def compare(results, baseline_file):
+    """
+    Prints the ticks/sec and episode time of each run relative to the same run in a baseline result file.
+    """
+    with open(baseline_file) as file:
+        baseline = {config_key(result): result for result in json.load(file)["results"]}
+    print("\n{:<60} {:>14} {:>14}".format("run", "ticks/sec", "episode time"))
+    for result in results:
+        old = baseline.get(config_key(result))
+        if old is None or "error" in result or "error" in old:
+            continue
+        # ticks/sec is None for runs that did not take measurable time
+        speedup = result["ticks_per_sec"] / old["ticks_per_sec"] \
+            if result["ticks_per_sec"] and old["ticks_per_sec"] else float("nan")
+        time_ratio = result["episode_time"] / old["episode_time"] if old["episode_time"] else float("nan")
+        print("{:<60} {:>13.2f}x {:>13.2f}x".format(str(config_key(result)), speedup, time_ratio))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-output", action='store', help="The json file to write the results to",
+                        default="benchmark_results.json")
+    parser.add_argument("-seeds", action='store', help="How many seeds to run per configuration", default=3, type=int)
+    parser.add_argument("-deadline", action='store', help="Ticks after which a run stops", default=1000, type=int)
+    parser.add_argument("-quick", action='store_true', help="Only run a small grid", default=False)
+    parser.add_argument("-compare", action='store', help="A result file to compare the results with", default=None)
+    args = parser.parse_args()
+
+    configs = grid_configs(QUICK_GRID if args.quick else GRID)
+    runs = [(config, seed, args.deadline) for config in configs for seed in range(args.seeds)]
+    output = os.path.abspath(args.output)
+    print("Running " + str(len(runs)) + " benchmarks.")
+
+    results = []
+    start = time.time()
+    # A new process for every run, so the peak RSS of a run is not that of an earlier, larger run
+    with multiprocessing.get_context("spawn").Pool(processes=1, maxtasksperchild=1) as pool:
+        for i, result in enumerate(pool.imap(run_benchmark_args, runs)):
+            results.append(result)
+            if "error" in result:
+                print(str(i + 1) + ": " + str(config_key(result)) + " failed: " + result["error"])
+            else:
+                print(str(i + 1) + ": " + str(config_key(result)) + " {:.1f} ticks/sec, {} ticks, {:.2f}s"
+                      .format(result["ticks_per_sec"] or 0.0, result["ticks"], result["episode_time"]))
+
+    with open(output, "w") as file:
+        json.dump({
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "deadline": args.deadline,
+            "grid": QUICK_GRID if args.quick else GRID,
+            "duration": time.time() - start,
+            "results": results,
+        }, file, indent=2)
+    print("Results written to " + output)
+
+    if args.compare is not None:
+        compare(results, args.compare)
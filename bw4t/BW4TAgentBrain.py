@@ -5,6 +5,8 @@ from matrx.agents.agent_brain import AgentBrain
 from matrx.actions import GrabObject, RemoveObject, OpenDoorAction, CloseDoorAction
 from matrx.agents.agent_utils.state import State
 from matrx.messages import Message
+from bw4t.BW4TProfiler import NO_PROFILING
+from bw4t.BW4TState import BW4TState
 
 
 class BW4TAgentBrain(AgentBrain):
@@ -91,6 +93,10 @@ class BW4TAgentBrain(AgentBrain):
         # The central state property (an extended dict with unique searching capabilities)
         self._state = None
 
+        # The BW4TProfiler that records the time spent in each stage of a tick, None if not profiling
+        self._profiler = None
+        self._profile_tick = 0
+
     def initialize(self):
         """ Method called by any world when it starts.
         When adding an agent to a :class:`matrx.grid_world.GridWorld`, through
@@ -511,22 +517,66 @@ class BW4TAgentBrain(AgentBrain):
         # Process any properties of this agent which were updated in the environment as a result of actions
         self.agent_properties = agent_properties
 
+        state_dict = state.as_dict()
+        self._profile_tick = state_dict["World"]["nr_ticks"]
+
         # Update the state property of an agent with the GridWorld's state dictionary
-        self.state.state_update(state.as_dict())
+        with self.profile("state_update"):
+            self.state.state_update(state_dict)
 
         # Call the filter method to filter the observation
-        self.state = self.filter_observations(self.state)
+        with self.profile("filter_observations"):
+            self.state = self.filter_observations(self.state)
 
         # Call the method that decides on an action
-        action, action_kwargs = self.decide_on_action(self.state)
+        with self.profile("decide_on_action"):
+            action, action_kwargs = self.decide_on_action(self.state)
 
         # Store the action so in the next call the agent still knows what it did
         self.previous_action = action
 
+        # The next decision only needs the changes to the state after this one
+        if isinstance(self.state, BW4TState):
+            self.state.clear_changes()
+
         # Return the filtered state, the (updated) properties, the intended actions and any keyword arguments for that
         # action if needed.
         return self.state, self.agent_properties, action, action_kwargs
 
+    def set_profiler(self, profiler):
+        """ Attaches a BW4TProfiler that records the time this agent spends in each stage of its ticks.
+        Parameters
+        ----------
+        profiler : BW4TProfiler
+            The profiler, or None to stop profiling.
+        """
+        self._profiler = profiler
+
+    def profile(self, stage):
+        """ Measures the wall time of a stage of the current tick of this agent.
+        Use as `with self.profile("my_stage"): ...`. Does nothing if no profiler is attached.
+        Parameters
+        ----------
+        stage : str
+            The name of the stage, times of the same stage in a tick are added up.
+        """
+        if self._profiler is None:
+            return NO_PROFILING
+        return self._profiler.measure(self._profile_tick, self.agent_id, stage)
+
+    def report_counter(self, counter, value):
+        """ Reports the value of a named counter of this agent to the profiler, eg. how often something was avoided.
+        Does nothing if no profiler is attached.
+        Parameters
+        ----------
+        counter : str
+            The name of the counter.
+        value : int
+            The value of the counter, replaces an earlier reported value.
+        """
+        if self._profiler is not None:
+            self._profiler.setCounter(self.agent_id, counter, value)
+
     def _fetch_state(self, state):
         self.state.state_update(state.as_dict())
         filtered_state = self.filter_observations(self.state)
@@ -615,8 +665,9 @@ class BW4TAgentBrain(AgentBrain):
             self.received_messages.append(mssg)
 
     def _init_state(self):
-        self._state = State(memorize_for_ticks=self.memorize_for_ticks,
-                            own_id=self.agent_id)
+        # A BW4TState also tracks which objects changed since the previous tick
+        self._state = BW4TState(memorize_for_ticks=self.memorize_for_ticks,
+                                own_id=self.agent_id)
 
     @staticmethod
     def __check_message(mssg, this_agent_id):
@@ -0,0 +1,75 @@
+from typing import List, Tuple
+
+
+class BlackboardEntry:
+    '''
+    A single piece of knowledge posted on a BW4TBlackboard.
+    Like a message it has a sender (from_id), a kind and a payload dict,
+    but it is stored once for the whole team instead of copied to every agent.
+    '''
+    __slots__ = ('version', 'tick', 'from_id', 'kind', 'payload', '_key')
+
+    def __init__(self, version:int, tick:int, from_id:str, kind, payload:dict):
+        self.version = version
+        self.tick = tick
+        self.from_id = from_id
+        self.kind = kind
+        self.payload = payload
+        # Every reader checks the keys of the entries it read before posting, so the key is made once
+        self._key = (kind, tuple(sorted(payload.items())))
+
+    def key(self):
+        '''
+        @return hashable key of the kind and payload of this entry
+        '''
+        return self._key
+
+
+class BW4TBlackboard:
+    '''
+    Knowledge shared by the agents of a team, as an alternative to
+    broadcasting messages. Every posted entry gets the next version number.
+    Agents keep the last version they read and only read the entries
+    posted after it.
+    Entries posted in a tick can be read from the next tick on, just
+    like messages sent in a tick arrive at the end of that tick.
+    The blackboard does not judge entries: it is up to every reader
+    whether it trusts the sender of an entry.
+    '''
+
+    def __init__(self):
+        # All entries in the order they were posted, entry i has version i + 1
+        self._entries: List[BlackboardEntry] = []
+
+    def post(self, tick:int, from_id:str, kind, payload:dict) -> int:
+        '''
+        add an entry to the blackboard
+        @param tick the current tick of the sender
+        @return the version of the new entry
+        '''
+        entry = BlackboardEntry(len(self._entries) + 1, tick, from_id, kind, payload)
+        self._entries.append(entry)
+        return entry.version
+
+    def read(self, version:int, tick:int) -> Tuple[List[BlackboardEntry], int]:
+        '''
+        @param version the last version the reader has read, 0 to read everything
+        @param tick the current tick of the reader, entries posted in this tick are not read yet
+        @return tuple (entries, version) with the entries posted after the given
+        version before the given tick, in the order they were posted, and the
+        version to pass to the next read.
+        '''
+        end = version
+        # Entries are posted in tick order, so stop at the first one of the current tick
+        while end < len(self._entries) and self._entries[end].tick < tick:
+            end += 1
+        return self._entries[version:end], end
+
+    def getVersion(self) -> int:
+        '''
+        @return the version of the last posted entry, 0 if the blackboard is empty
+        '''
+        return len(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
@@ -33,6 +33,10 @@ class BW4TBrain(BW4TAgentBrain, ABC):
         self.__settings = self.DEFAULT_SETTINGS.copy()
         self.__settings.update(settings)
         super().__init__()
+        # The BW4TBlackboard shared with the team, None if the team communicates with messages only
+        self.blackboard = None
+        # The rooms and drop offs of the world, see BW4TWorld.getWorldLayout. None if not given by the world
+        self.world_layout = None
 
     # @final
     def initialize(self):
@@ -51,6 +55,30 @@ class BW4TBrain(BW4TAgentBrain, ABC):
             )
         return act, params
 
+    def set_blackboard(self, blackboard):
+        """
+        Called by BW4TWorld before the world starts when the team shares a blackboard.
+        @param blackboard the BW4TBlackboard of the team
+        """
+        self.blackboard = blackboard
+
+    def set_world_layout(self, world_layout):
+        """
+        Called by BW4TWorld before the world starts, so agents do not have
+        to search the state for the rooms and drop offs.
+        @param world_layout the descriptor of BW4TWorld.getWorldLayout
+        """
+        self.world_layout = world_layout
+
+    def episode_ended(self):
+        """
+        Called by BW4TWorld once the world has terminated.
+        Use this to persist anything that must survive between runs,
+        eg. beliefs that are only written to disk occasionally, or to
+        report counters to the profiler with report_counter.
+        """
+        pass
+
     def filter_bw4t_observations(self, state) -> State:
         """
         Filters the world state before deciding on an action.
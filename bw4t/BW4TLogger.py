@@ -1,3 +1,6 @@
+import json
+import os
+
 import numpy as np
 from matrx.logger.logger import GridWorldLogger
 from matrx.grid_world import GridWorld
@@ -11,6 +14,9 @@ class BW4TLogger(GridWorldLogger):
     def __init__(self, save_path="", file_name_prefix="", file_extension=".csv", delimeter=";"):
         super().__init__(save_path=save_path, file_name=file_name_prefix, file_extension=file_extension,
                          delimiter=delimeter, log_strategy=1)
+        # Running number of ticks in which each agent sent a message, and the first tick that is not yet counted
+        self._message_counts = {}
+        self._next_tick = 0
 
     def log(self, grid_world:GridWorld, agent_data):
         # So agent_data is a dictionary of shape: {<agent id>: <result from agent's get_log_data>, ...}
@@ -24,14 +30,18 @@ class BW4TLogger(GridWorldLogger):
 
         gwmm = grid_world.message_manager
         t = grid_world.current_nr_ticks-1
-        for agent_id, agent_body in grid_world.registered_agents.items():
-            data[agent_id+'_mssg']=0
-            for i in range(0,t):
-                if i in gwmm.preprocessed_messages.keys():
-                    for mssg in gwmm.preprocessed_messages[i]:
-                        if mssg.from_id==agent_id:
-                            data[agent_id+'_mssg']+=1
-                            break
+        for agent_id in grid_world.registered_agents.keys():
+            self._message_counts.setdefault(agent_id, 0)
+        # Only count the ticks that were added since the previous log
+        for i in range(self._next_tick, t):
+            if i in gwmm.preprocessed_messages.keys():
+                senders = {mssg.from_id for mssg in gwmm.preprocessed_messages[i]}
+                for agent_id in senders:
+                    if agent_id in self._message_counts:
+                        self._message_counts[agent_id] += 1
+        self._next_tick = max(self._next_tick, t)
+        for agent_id in grid_world.registered_agents.keys():
+            data[agent_id+'_mssg'] = self._message_counts[agent_id]
         return data
 
     # workaround for issue matrx267
@@ -40,4 +50,120 @@ class BW4TLogger(GridWorldLogger):
         @return the log filename written by this logger
         '''
         return self._GridWorldLogger__file_name
-    
\ No newline at end of file
+    
+    def flush(self):
+        '''
+        Write any buffered rows. Rows of this logger are written every tick, so there is nothing to do.
+        '''
+        pass
+
+
+class BW4TBinaryLogger(BW4TLogger):
+    '''
+    Logs the same columns as BW4TLogger, but streams them to a compact
+    binary file instead of a csv file. Every logged tick is one fixed size
+    record, so the file can be memory mapped as a numpy structured array:
+    done is a bool, message counts, world nr and tick nr are int32 and the
+    actions are uint16 codes into a dictionary of action names.
+    The dictionary, the columns and the number of written rows are kept in
+    a json file next to the data file (same name, .json extension).
+    Rows are buffered and written in blocks.
+    '''
+    def __init__(self, save_path="", file_name_prefix="", file_extension=".bin", block_size=100):
+        '''
+        @param block_size number of rows buffered before they are written to the file
+        '''
+        super().__init__(save_path=save_path, file_name_prefix=file_name_prefix, file_extension=file_extension)
+        self._block_size = block_size
+        self._dtype = None
+        self._columns = []
+        # Action names in order of their code, None is logged as ''
+        self._action_names = []
+        self._action_codes = {}
+        self._rows = []
+        self._nr_written_rows = 0
+
+    # override
+    def _grid_world_log(self, grid_world, agent_data, last_tick=False, goal_status=None):
+        if self._needs_to_log(grid_world, last_tick, goal_status):
+            data = self.log(grid_world, agent_data)
+            data['world_nr'] = self._GridWorldLogger__world_nr
+            data['tick_nr'] = grid_world.current_nr_ticks
+            self._addRow(data)
+        if last_tick or len(self._rows) >= self._block_size:
+            self.flush()
+
+    def _addRow(self, data:dict):
+        '''
+        encode a logged dict as a record and buffer it
+        '''
+        if self._dtype is None:
+            self._columns = list(data.keys())
+            self._dtype = np.dtype([(column, self._getColumnType(column)) for column in self._columns])
+        row = []
+        for column in self._columns:
+            if column.endswith('_acts'):
+                action = data[column] if data[column] is not None else ''
+                if action not in self._action_codes:
+                    self._action_codes[action] = len(self._action_names)
+                    self._action_names.append(action)
+                row.append(self._action_codes[action])
+            else:
+                row.append(data[column])
+        self._rows.append(tuple(row))
+
+    @staticmethod
+    def _getColumnType(column:str):
+        '''
+        @return numpy type of the column
+        '''
+        if column == 'done':
+            return '?'
+        if column.endswith('_acts'):
+            return '<u2'
+        return '<i4'
+
+    def flush(self):
+        '''
+        Append the buffered rows to the data file and rewrite the json file.
+        '''
+        if self._dtype is None:
+            return
+        if len(self._rows) > 0:
+            with open(self.getFileName(), 'ab') as data_file:
+                np.array(self._rows, dtype=self._dtype).tofile(data_file)
+            self._nr_written_rows += len(self._rows)
+            self._rows = []
+
+        header_file = getBinaryLogHeaderFileName(self.getFileName())
+        with open(header_file + '.tmp', 'w') as file:
+            json.dump({'columns': self._columns,
+                       'dtype': [[column, self._getColumnType(column)] for column in self._columns],
+                       'actions': self._action_names,
+                       'rows': self._nr_written_rows}, file)
+        os.replace(header_file + '.tmp', header_file)
+
+
+def getBinaryLogHeaderFileName(filename:str):
+    '''
+    @param filename the data file of a BW4TBinaryLogger
+    @return the json file with the columns, dtype, action names and number of rows of the data file
+    '''
+    return os.path.splitext(filename)[0] + '.json'
+
+
+def readBinaryLog(filename:str):
+    '''
+    @param filename the data file of a BW4TBinaryLogger
+    @return tuple (columns, records, action names). records is a read only
+    memory mapped numpy structured array with one record per logged tick
+    and a field for each column.
+    '''
+    with open(getBinaryLogHeaderFileName(filename)) as file:
+        header = json.load(file)
+    dtype = np.dtype([(column, column_type) for column, column_type in header['dtype']])
+    if header['rows'] == 0:
+        records = np.zeros(0, dtype=dtype)
+    else:
+        records = np.memmap(filename, dtype=dtype, mode='r', shape=(header['rows'],))
+    return header['columns'], records, header['actions']
@@ -0,0 +1,132 @@
+import csv
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Tuple
+
+# Returned by BW4TAgentBrain.profile when no profiler is attached, so unprofiled runs only pay for an empty with
+NO_PROFILING = nullcontext()
+
+
+class BW4TProfiler:
+    '''
+    Records the wall time that agents spend in named stages of their
+    tick, eg. 'state_update', 'decide' or 'path_planning'.
+    Times are accumulated per tick, per agent and per stage.
+    Stages may be nested, eg. the time of 'path_planning' is also
+    part of the time of the phase stage it was called from.
+    Agents can also report named counters, eg. how often they avoided
+    planning a new route, which are listed below the stages in the summary.
+    '''
+
+    def __init__(self):
+        # (tick, agent_id, stage) -> [number of calls, total seconds]
+        self._records: Dict[Tuple[int, str, str], list] = {}
+        # (agent_id, counter) -> value
+        self._counters: Dict[Tuple[str, str], int] = {}
+
+    @contextmanager
+    def measure(self, tick:int, agent_id:str, stage:str):
+        '''
+        context manager that adds the wall time of its body to the stage
+        of the agent in the given tick.
+        '''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(tick, agent_id, stage, time.perf_counter() - start)
+
+    def add(self, tick:int, agent_id:str, stage:str, seconds:float):
+        '''
+        add one call of the stage that took the given number of seconds
+        '''
+        record = self._records.setdefault((tick, agent_id, stage), [0, 0.0])
+        record[0] += 1
+        record[1] += seconds
+
+    def setCounter(self, agent_id:str, counter:str, value:int):
+        '''
+        set the value of a named counter of the agent
+        '''
+        self._counters[(agent_id, counter)] = value
+
+    def getCounters(self):
+        '''
+        @return dict with as keys (agent_id, counter) and as values the counter values
+        '''
+        return dict(self._counters)
+
+    def getRecords(self):
+        '''
+        @return dict with as keys (tick, agent_id, stage) and as values
+        (number of calls, total seconds)
+        '''
+        return {key: tuple(record) for key, record in self._records.items()}
+
+    def getSummary(self):
+        '''
+        @return dict with as keys (agent_id, stage) and as values a dict with
+        'calls', 'ticks', 'total', 'mean' (seconds per tick the stage ran)
+        and 'max' (most seconds in a single tick)
+        '''
+        summary = {}
+        for (tick, agent_id, stage), (calls, seconds) in self._records.items():
+            row = summary.setdefault((agent_id, stage), {'calls': 0, 'ticks': 0, 'total': 0.0, 'max': 0.0})
+            row['calls'] += calls
+            row['ticks'] += 1
+            row['total'] += seconds
+            row['max'] = max(row['max'], seconds)
+        for row in summary.values():
+            row['mean'] = row['total'] / row['ticks']
+        return summary
+
+    def writeCsv(self, filename:str):
+        '''
+        write one row per tick, agent and stage to a csv file with
+        header tick_nr;agent_id;stage;calls;seconds
+        '''
+        with open(filename, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile, delimiter=';')
+            writer.writerow(['tick_nr', 'agent_id', 'stage', 'calls', 'seconds'])
+            for (tick, agent_id, stage), (calls, seconds) in sorted(self._records.items()):
+                writer.writerow([tick, agent_id, stage, calls, seconds])
+
+    def writeSummary(self, filename:str):
+        '''
+        write a table with the totals of each agent and stage, the most
+        expensive stages first.
+        '''
+        with open(filename, 'w') as file:
+            file.write(self.summaryTable())
+
+    def summaryTable(self):
+        '''
+        @return the summary as a human readable table, the most expensive stages first,
+        followed by a table with the counters of the agents if they reported any
+        '''
+        summary = sorted(self.getSummary().items(), key=lambda item: -item[1]['total'])
+        lines = ["{:<20} {:<24} {:>8} {:>8} {:>12} {:>14} {:>13}".format(
+            'agent', 'stage', 'calls', 'ticks', 'total (s)', 'mean/tick (ms)', 'max/tick (ms)')]
+        for (agent_id, stage), row in summary:
+            lines.append("{:<20} {:<24} {:>8} {:>8} {:>12.4f} {:>14.4f} {:>13.4f}".format(
+                agent_id, stage, row['calls'], row['ticks'], row['total'], row['mean'] * 1000, row['max'] * 1000))
+        if self._counters:
+            lines.append("")
+            lines.append("{:<20} {:<24} {:>8}".format('agent', 'counter', 'value'))
+            for (agent_id, counter), value in sorted(self._counters.items()):
+                lines.append("{:<20} {:<24} {:>8}".format(agent_id, counter, value))
+        return "\n".join(lines) + "\n"
+
+    def write(self, log_filename:str):
+        '''
+        write the per tick csv and the summary table next to a log file.
+        @param log_filename the log file of the BW4TLogger, eg. world_1/_20220101.csv
+        @return tuple (csv filename, summary filename)
+        '''
+        base = os.path.splitext(log_filename)[0]
+        csv_filename = base + '_profile.csv'
+        summary_filename = base + '_profile.txt'
+        self.writeCsv(csv_filename)
+        self.writeSummary(summary_filename)
+        return csv_filename, summary_filename
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import time
+from typing import List, Optional
+
+
+def getCodeVersion(folders:List[str]) -> str:
+    '''
+    @param folders the folders with the python code that determines the outcome of an episode
+    @return hex hash of the contents of all .py files in the folders and their sub folders
+    '''
+    version = hashlib.sha256()
+    for folder in folders:
+        for root, dirs, files in sorted(os.walk(folder)):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.endswith('.py'):
+                    path = os.path.join(root, filename)
+                    version.update(os.path.relpath(path, folder).encode())
+                    with open(path, 'rb') as file:
+                        version.update(file.read())
+    return version.hexdigest()
+
+
+class BW4TResultCache:
+    '''
+    Stores the results of episodes on disk, so that a tournament that is
+    run again with the same worlds, agents and code can skip the episodes
+    it already ran.
+    Every result is a json file in the cache folder, named after the hash
+    of everything that determines the outcome of the episode (see makeKey).
+    The oldest results are removed when the cache gets too big or results
+    get too old.
+    '''
+
+    def __init__(self, folder:str, max_bytes:Optional[int]=None, max_age:Optional[float]=None):
+        '''
+        @param folder the folder to store the results in, created if it does not exist
+        @param max_bytes the max total size of the stored results, None for no limit
+        @param max_age the max age of a result in seconds, None for no limit
+        '''
+        self._folder = folder
+        self._max_bytes = max_bytes
+        self._max_age = max_age
+        self._hits = 0
+        self._misses = 0
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+    @staticmethod
+    def makeKey(**parts) -> str:
+        '''
+        @param parts everything that determines the outcome of an episode,
+        eg. world_settings, agents, code_version and the trust at the start.
+        Values must be json serializable, except for classes and other
+        objects which are described by their module and name.
+        @return hex hash of the parts
+        '''
+        description = json.dumps(parts, sort_keys=True, default=_describe)
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def get(self, key:str) -> Optional[dict]:
+        '''
+        @return the result stored with the key, None if there is none or it is too old
+        '''
+        filename = self._getFileName(key)
+        if not os.path.exists(filename) or self._isExpired(filename):
+            self._misses += 1
+            return None
+        with open(filename) as file:
+            result = json.load(file)
+        self._hits += 1
+        return result
+
+    def put(self, key:str, result:dict):
+        '''
+        store a result, and evict the oldest results if the cache got too big
+        @param result json serializable dict
+        '''
+        filename = self._getFileName(key)
+        with open(filename + '.tmp', 'w') as file:
+            json.dump(result, file)
+        os.replace(filename + '.tmp', filename)
+        self.evict()
+
+    def evict(self):
+        '''
+        remove the results that are too old, and then the oldest results
+        until the total size is at most max_bytes
+        @return number of removed results
+        '''
+        entries = []
+        for filename in os.listdir(self._folder):
+            if filename.endswith('.json'):
+                path = os.path.join(self._folder, filename)
+                entries.append((os.path.getmtime(path), os.path.getsize(path), path))
+        entries.sort()
+
+        removed = 0
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._isExpired(path) or (self._max_bytes is not None and total_bytes > self._max_bytes):
+                os.remove(path)
+                total_bytes -= size
+                removed += 1
+        return removed
+
+    def getHits(self):
+        '''
+        @return number of get calls that returned a result
+        '''
+        return self._hits
+
+    def getMisses(self):
+        '''
+        @return number of get calls that returned None
+        '''
+        return self._misses
+
+    def _getFileName(self, key:str):
+        return os.path.join(self._folder, key + '.json')
+
+    def _isExpired(self, filename:str):
+        return self._max_age is not None and time.time() - os.path.getmtime(filename) > self._max_age
+
+
+def _describe(value):
+    '''
+    @return json serializable description of a value json can not serialize itself
+    '''
+    if isinstance(value, type):
+        return value.__module__ + '.' + value.__qualname__
+    if hasattr(value, 'item'):
+        # numpy scalars
+        return value.item()
+    return repr(value)
@@ -0,0 +1,223 @@
+from itertools import count
+from operator import itemgetter
+from typing import Callable, Dict, List, Set
+
+from matrx.agents.agent_utils.state import State
+
+# Properties that can change while an object stays in the state. Other
+# properties are assumed to stay the same as long as an object is perceived.
+VOLATILE_PROPERTIES = ('location', 'carried_by', 'is_open', 'is_traversable', 'is_carrying', 'is_blocked_by_action')
+
+
+class BW4TState(State):
+    '''
+    The State of a BW4T agent.
+    Besides merging the observations like a matrx State, it keeps track of
+    the objects that appeared, disappeared or changed since the agent last
+    decided on an action, so agents can process only those objects.
+    It also keeps indexes of the objects by class, by boolean property and
+    by location, so that eg. get_of_type("Door"),
+    get_with_property({"is_collectable": True}) and get_objects_at(location)
+    cost as much as the number of objects found instead of the number of
+    objects in the state.
+    Only the VOLATILE_PROPERTIES of the objects that can change (agents,
+    movable objects and doors) are compared between updates. Walls and
+    other static objects are only checked for appearing and disappearing.
+    '''
+
+    def __init__(self, own_id, memorize_for_ticks=None):
+        super().__init__(own_id, memorize_for_ticks=memorize_for_ticks)
+        # Position of each object in the state dict, to return found objects in state order.
+        # None until it is needed after an update
+        self._positions:Dict[str, int] = None
+        self._added:Set[str] = set()
+        self._removed:Set[str] = set()
+        self._changed:Set[str] = set()
+        # Objects that can change, with a function that returns their volatile property values
+        self._volatile:Dict[str, Callable] = {}
+        # Ids of the objects by (property name, boolean value) and by ("class_inheritance", class name)
+        self._by_value:Dict[tuple, Set[str]] = {}
+        # Ids of the objects by location
+        self._by_location:Dict[tuple, Set[str]] = {}
+        # Names of properties that are not a boolean for some object, these can not be answered from the index
+        self._unindexed:Set[str] = set()
+
+    def state_update(self, state_dict):
+        # matrx replaces the state dict on an update, so the previous one is kept as it is
+        previous = self.as_dict()
+        super().state_update(state_dict)
+        objects = self.as_dict()
+        self._positions = None
+        appeared = objects.keys() - previous.keys()
+        disappeared = previous.keys() - objects.keys()
+        for obj_id in disappeared:
+            self._unindex(obj_id, previous[obj_id])
+            self._volatile.pop(obj_id, None)
+            if obj_id in self._added:
+                self._added.discard(obj_id)
+            else:
+                self._changed.discard(obj_id)
+                self._removed.add(obj_id)
+        for obj_id in appeared:
+            self._index(obj_id, objects[obj_id])
+            if obj_id in self._removed:
+                # Removed and back again since the changes were cleared
+                self._removed.discard(obj_id)
+                self._changed.add(obj_id)
+            else:
+                self._added.add(obj_id)
+        for obj_id, get_volatile in self._volatile.items():
+            if obj_id in appeared:
+                continue
+            old_properties, properties = previous[obj_id], objects[obj_id]
+            if old_properties is not properties and get_volatile(old_properties) != get_volatile(properties):
+                self._unindex(obj_id, old_properties)
+                self._index(obj_id, properties)
+                if obj_id not in self._added:
+                    self._changed.add(obj_id)
+        return self
+
+    def clear_changes(self):
+        '''
+        Forget the added, removed and changed objects.
+        BW4TAgentBrain calls this after every decision, so the changes are
+        those since the agent last decided on an action. The state can be
+        updated more than once in between, eg. while the agent is busy.
+        '''
+        self._added = set()
+        self._removed = set()
+        self._changed = set()
+
+    def get_added_ids(self) -> Set[str]:
+        '''
+        @return ids of the objects that appeared since the changes were cleared
+        '''
+        return self._added
+
+    def get_removed_ids(self) -> Set[str]:
+        '''
+        @return ids of the objects that disappeared since the changes were cleared
+        '''
+        return self._removed
+
+    def get_changed_ids(self) -> Set[str]:
+        '''
+        @return ids of the objects that were in the state when the changes were
+        cleared, and whose VOLATILE_PROPERTIES changed since
+        '''
+        return self._changed
+
+    def get_with_property(self, props, combined=True):
+        '''
+        Same as the get_with_property of a matrx State. Objects with all of a
+        number of boolean property values and/or a class name, eg.
+        {"class_inheritance": "Door", "is_open": False}, are found with the
+        index and returned in state order.
+        '''
+        keys = self._get_index_keys(props, combined)
+        if keys is None:
+            return super().get_with_property(props, combined)
+        obj_ids = self._by_value.get(keys[0], set())
+        for key in keys[1:]:
+            obj_ids = obj_ids & self._by_value.get(key, set())
+        if not obj_ids:
+            return None
+        return self._in_state_order(obj_ids)
+
+    def get_objects_at(self, location) -> List[dict]:
+        '''
+        @param location (x, y) location
+        @return the objects at the location in state order, an empty list if there are none
+        '''
+        return self._in_state_order(self._by_location.get(tuple(location), ()))
+
+    def __delitem__(self, key):
+        self._forget(key)
+        super().__delitem__(key)
+
+    def pop(self, obj_id):
+        self._forget(obj_id)
+        return super().pop(obj_id)
+
+    def remove(self, obj_id):
+        self._forget(obj_id)
+        super().remove(obj_id)
+
+    def _forget(self, obj_id):
+        '''
+        remove an object from the index, it is added again if it is in the next update
+        '''
+        properties = self.as_dict().get(obj_id)
+        if properties is not None:
+            self._unindex(obj_id, properties)
+            self._volatile.pop(obj_id, None)
+            self._positions = None
+
+    def _get_index_keys(self, props, combined):
+        '''
+        @return the index keys of all the property values in props,
+        None if props can not be answered from the index
+        '''
+        if not isinstance(props, dict) or len(props) == 0 or (len(props) > 1 and not combined):
+            return None
+        keys = []
+        for name, value in props.items():
+            if isinstance(value, bool) and name not in self._unindexed:
+                keys.append((name, value))
+            elif name == "class_inheritance" and isinstance(value, str) and name not in self._unindexed:
+                keys.append((name, value))
+            else:
+                return None
+        return keys
+
+    def _in_state_order(self, obj_ids):
+        objects = self.as_dict()
+        if self._positions is None:
+            self._positions = dict(zip(objects, count()))
+        return [objects[obj_id] for obj_id in sorted(obj_ids, key=self._positions.__getitem__)]
+
+    def _get_value_keys(self, properties):
+        '''
+        @return the index keys of the property values of an object
+        '''
+        keys = []
+        for name, value in properties.items():
+            if isinstance(value, bool):
+                keys.append((name, value))
+            elif name == "class_inheritance" and isinstance(value, list):
+                keys.extend((name, class_name) for class_name in value)
+        return keys
+
+    def _index(self, obj_id, properties):
+        for key in self._get_value_keys(properties):
+            self._by_value.setdefault(key, set()).add(obj_id)
+        for name, value in properties.items():
+            if not isinstance(value, bool) and (name != "class_inheritance" or not isinstance(value, list)):
+                self._unindexed.add(name)
+        if "location" in properties:
+            self._by_location.setdefault(tuple(properties["location"]), set()).add(obj_id)
+        # Agents, movable objects and doors can change, other objects stay the same
+        if obj_id not in self._volatile and (properties.get('isAgent', False) or properties.get('is_movable', False)
+                                             or 'is_open' in properties):
+            volatile = [name for name in VOLATILE_PROPERTIES if name in properties]
+            self._volatile[obj_id] = itemgetter(*volatile) if volatile else _no_properties
+
+    def _unindex(self, obj_id, properties):
+        for key in self._get_value_keys(properties):
+            _discard(self._by_value, key, obj_id)
+        if "location" in properties:
+            _discard(self._by_location, tuple(properties["location"]), obj_id)
+
+
+def _discard(index, key, obj_id):
+    '''
+    remove an object id from an index, and the key if no object is left
+    '''
+    obj_ids = index[key]
+    obj_ids.discard(obj_id)
+    if not obj_ids:
+        del index[key]
+
+
+def _no_properties(properties):
+    return ()
@@ -1,7 +1,8 @@
 import numpy as np
-import random
+import hashlib
 import pathlib
 import os
+import time
 from typing import Final, List
 from matrx.actions.move_actions import MoveEast, MoveSouth, MoveWest
 from matrx.actions import MoveNorth, OpenDoorAction, CloseDoorAction
@@ -9,12 +10,16 @@ from matrx.grid_world import GridWorld, DropObject, GrabObject, AgentBody
 from matrx import WorldBuilder
 from matrx.world_builder import RandomProperty
 from matrx.agents import SenseCapability
-from matrx.utils import get_room_locations
+from matrx.objects import Door
 from bw4t.BW4TBlocks import CollectableBlock, GhostBlock
 from agents1.BW4THuman import Human
 from bw4t.CollectionGoal import CollectionGoal
-from bw4t.BW4TLogger import BW4TLogger
+from bw4t.BW4TLogger import BW4TLogger, BW4TBinaryLogger
 from bw4t.BW4THumanBrain import HumanBrain
+from bw4t.BW4TBrain import BW4TBrain
+from bw4t.BW4TAgentBrain import BW4TAgentBrain
+from bw4t.BW4TProfiler import BW4TProfiler
+from bw4t.BW4TBlackboard import BW4TBlackboard
 
 DEFAULT_WORLDSETTINGS: dict = {
     'deadline': 3000,  # Ticks after which world terminates anyway
@@ -55,7 +60,10 @@ DEFAULT_WORLDSETTINGS: dict = {
     'agent_memory_decay': 5,  # we want to memorize states for seconds / tick_duration ticks
     'fov_occlusion' : True, # true if walls block vision. Not sure if this works at all.
 
-    'only_completable' : False
+    'only_completable' : False,
+    'profile' : False, # true to record the time agents spend in each stage of a tick, written next to the log
+    'team_blackboard' : False, # true to give the agents a shared blackboard to use instead of messages
+    'binary_log' : False, # true to log to a compact binary file (BW4TBinaryLogger) instead of a csv file
 }
 
 
@@ -67,7 +75,12 @@ class BW4TWorld:
     and therefore this approach seems not possible.
     Instead, this only supports the 'run' function and
     internally creates the gridworld using WorldBuilder.
-    
+
+    The builder and the static layout (world bounds, rooms and
+    drop zones) are created once. A new episode on the same layout
+    can be started with reset, which only re-rolls the blocks and
+    creates new agents, so batches of headless runs do not pay for
+    rebuilding the world each time.
     '''
 
     def __init__(self, agents: List[dict], worldsettings: dict = DEFAULT_WORLDSETTINGS):
@@ -80,12 +93,16 @@ class BW4TWorld:
             Names must all be unique.
             Check BW4TBrain for more on the agents specification.
         '''
+        start = time.perf_counter()
         self._worldsettings = worldsettings;
         self._agents = agents
         self._generated_blocks = []
+        self._brains = []
         self._only_completable = worldsettings["only_completable"]
+        self._run_time = 0.0
 
-        np.random.seed(worldsettings['random_seed'])
+        # All blocks and goal blocks are drawn from this generator, so a world only depends on its settings
+        self._rng = np.random.RandomState(worldsettings['random_seed'])
         world_size = self.world_size()
 
         # Create the goal
@@ -103,30 +120,173 @@ class BW4TWorld:
 
         # Add the world bounds (not needed, as agents cannot 'walk off' the grid, but for visual effects)
         self._builder.add_room(top_left_location=(0, 0), width=world_size[0], height=world_size[1], name="world_bounds")
-        room_locations = self._addRooms()
-        self._addBlocks(room_locations)
-        self._addDropOffZones(world_size)
-
-        # Add the agents and human agents to the top row of the world
-        self._addAgents()
+        self._room_tiles = self._addRooms()
+        self._addDropOffAreas(world_size)
+        # Everything added after this is re-created for each episode
+        self._nr_layout_objects = len(self._builder.object_settings)
 
         #media_folder = os.path.dirname(os.path.join(os.path.realpath(__file__), "media"))
         media_folder = pathlib.Path().resolve()
         self._builder.startup(media_folder=media_folder)
-        self._builder.add_logger(BW4TLogger, save_path='.')
+        self._builder.add_logger(BW4TBinaryLogger if worldsettings.get('binary_log', False) else BW4TLogger,
+                                 save_path='.')
 
-        self._gridworld = self._builder.worlds(nr_of_worlds=1).__next__()
+        self._newEpisode()
+        self._setup_time = time.perf_counter() - start
 
     def run(self):
         '''
         run the world till termination
         '''
+        start = time.perf_counter()
         self._gridworld.run(self._builder.api_info)
+        self._run_time = time.perf_counter() - start
+        # The world may have been stopped before the goal was reached, so write the rows the logger still holds
+        self.getLogger().flush()
+        for brain in self._brains:
+            if isinstance(brain, BW4TBrain):
+                brain.episode_ended()
+        # Written after the agents ended, so the counters they report at the end are included
+        if self._profiler is not None:
+            self._profiler.write(self.getLogger().getFileName())
         return self
 
+    def reset(self, random_seed=None):
+        '''
+        Prepare a new episode on the same layout: the blocks and goal
+        blocks are rolled again, new agents are created from the agent
+        specifications and a new GridWorld is created by the builder.
+        The episode writes its log to a new world_<nr> folder.
+        @param random_seed the seed of the new episode, defaults to
+        the random_seed of the world settings.
+        @return this world, ready to run
+        '''
+        start = time.perf_counter()
+        if random_seed is None:
+            random_seed = self._worldsettings['random_seed']
+        self._rng = np.random.RandomState(random_seed)
+        self._builder.rng = np.random.RandomState(random_seed)
+        self._builder.world_settings['rnd_seed'] = random_seed
+        self._builder.world_settings['simulation_goal'] = CollectionGoal(self._worldsettings['deadline'])
+
+        # Remove the blocks, goal blocks and agents of the previous episode
+        del self._builder.object_settings[self._nr_layout_objects:]
+        self._builder.agent_settings = []
+        self._generated_blocks = []
+        self._brains = []
+        self._run_time = 0.0
+
+        self._newEpisode()
+        self._setup_time = time.perf_counter() - start
+        return self
+
+    def getSetupTime(self):
+        '''
+        @return seconds spent creating the current episode, including
+        the builder and layout if the episode was created by the constructor
+        '''
+        return self._setup_time
+
+    def getRunTime(self):
+        '''
+        @return seconds spent running the ticks of the current episode,
+        0 if it did not run yet
+        '''
+        return self._run_time
+
+    def getNrTicks(self):
+        '''
+        @return number of ticks the current episode ran
+        '''
+        return self._gridworld.current_nr_ticks
+
+    def getWorldFingerprint(self):
+        '''
+        @return hex hash of the world size, the layout and the blocks and
+        goal blocks of the current episode: the class, mandatory properties
+        and custom properties of every object. The agents are not part of it.
+        Worlds created with the same settings have the same fingerprint,
+        main.py stores it with the cached results of tournament rounds.
+        '''
+        fingerprint = hashlib.sha256(repr(self.world_size()).encode())
+        for settings in self._builder.object_settings:
+            fingerprint.update(repr((settings['callable_class'].__name__,
+                                     sorted(settings['mandatory_properties'].items()),
+                                     sorted(settings['custom_properties'].items()))).encode())
+        return fingerprint.hexdigest()
+
+    def _newEpisode(self):
+        '''
+        Add the blocks, goal blocks and agents to the builder
+        and create the GridWorld of the episode.
+        '''
+        self._addBlocks(self._room_tiles)
+        self._addGoalBlocks(self.world_size())
+
+        self._profiler = BW4TProfiler() if self._worldsettings.get('profile', False) else None
+        self._blackboard = BW4TBlackboard() if self._worldsettings.get('team_blackboard', False) else None
+
+        # Add the agents and human agents to the top row of the world
+        self._addAgents()
+
+        self._gridworld = self._builder.get_world()
+
+        self._world_layout = self._makeWorldLayout()
+        for brain in self._brains:
+            if isinstance(brain, BW4TBrain):
+                brain.set_world_layout(self._world_layout)
+
+    def getWorldLayout(self):
+        '''
+        @return descriptor of the rooms and drop offs of the current episode,
+        a dict with
+        * 'rooms': per room, in room order, a dict with the 'room_name', the
+          'door_id' and 'door_location' of its door and the 'room_size'
+          (width, height) including its walls.
+        * 'drop_offs': per goal block, in the order the goal blocks have to
+          be delivered per drop zone, a dict with its 'obj_id', 'location',
+          'colour', 'shape', 'size', 'drop_zone_nr' and its 'rank' in the zone.
+        The rooms and drop offs are in the same order as in the state of the agents.
+        '''
+        return self._world_layout
+
+    def _makeWorldLayout(self):
+        '''
+        @return the world layout descriptor, see getWorldLayout.
+        The objects are in the gridworld in the order they were added, which is
+        also the order in the state of the agents.
+        '''
+        rooms = []
+        drop_offs = []
+        # Number of goal blocks per drop zone so far
+        zone_sizes = {}
+        for env_object in self._gridworld.environment_objects.values():
+            if isinstance(env_object, Door):
+                door = env_object.properties
+                rooms.append({'room_name': door['room_name'], 'door_id': door['obj_id'],
+                              'door_location': door['location'],
+                              'room_size': tuple(self._worldsettings['room_size'])})
+            elif isinstance(env_object, GhostBlock):
+                ghost_block = env_object.properties
+                rank = zone_sizes.get(ghost_block['drop_zone_nr'], 0)
+                zone_sizes[ghost_block['drop_zone_nr']] = rank + 1
+                drop_offs.append({'obj_id': ghost_block['obj_id'], 'location': ghost_block['location'],
+                                  'colour': ghost_block['visualization']['colour'],
+                                  'shape': ghost_block['visualization']['shape'],
+                                  'size': ghost_block['visualization']['size'],
+                                  'drop_zone_nr': ghost_block['drop_zone_nr'], 'rank': rank})
+        return {'rooms': rooms, 'drop_offs': drop_offs}
+
+    def getProfiler(self):
+        '''
+        @return the BW4TProfiler of the current episode, None if the
+        profile setting is off
+        '''
+        return self._profiler
+
     def getLogger(self)->BW4TLogger:
         '''
-        @return the logger. We assume there is only 1: BW4TLogger
+        @return the logger. We assume there is only 1: BW4TLogger or BW4TBinaryLogger
         '''
         return self._gridworld._GridWorld__loggers[0]
 
@@ -148,34 +308,34 @@ class BW4TWorld:
         return int(world_width), int(world_height)
 
 
-    def _addBlocks(self, room_locations):
+    def _addBlocks(self, room_tiles):
         '''
-        Add blocks to all given room locations
+        Add blocks to the inner tiles of all rooms. The colour, shape and
+        presence of the blocks of all tiles are drawn at once, and only the
+        present blocks are added to the builder.
+        @param room_tiles array with shape (nr_rooms, nr_tiles_per_room, 2)
+        with the inner locations of each room
         '''
-        for room_name, locations in room_locations.items():
-            for loc in locations:
-                # Get the block's name
-                name = f"Block in {room_name}"
-
-                # Create a MATRX random property of shape and color so each block varies per created world.
-                # These random property objects are used to obtain a certain value each time a new world is
-                # created from this builder.
-                colour_property = self._worldsettings['block_colors'][random.randint(0, 2)]
-                shape_property = self._worldsettings['block_shapes'][random.randint(0, 2)]
-
-                prob = 0
-                if random.random() < self._worldsettings['average_blocks_per_room'] / len(locations):
-                    prob = 1.0
-                    self._generated_blocks.append({"colour": colour_property, "shape": shape_property})
-
-                # Add the block; a regular SquareBlock as denoted by the given 'callable_class' which the
-                # builder will use to create the object. In addition to setting MATRX properties, we also
-                # provide a `is_block` boolean as custom property so we can identify this as a collectible
-                # block.
-                self._builder.add_object_prospect(loc, name,
-                                                  callable_class=CollectableBlock, probability=prob,
-                                                  visualize_shape=shape_property, visualize_colour=colour_property,
-                                                  block_size=self._worldsettings['block_size'])
+        nr_rooms, nr_tiles = room_tiles.shape[0], room_tiles.shape[1]
+        colours = self._rng.randint(0, 3, size=(nr_rooms, nr_tiles))
+        shapes = self._rng.randint(0, 3, size=(nr_rooms, nr_tiles))
+        present = self._rng.random_sample((nr_rooms, nr_tiles)) < self._worldsettings['average_blocks_per_room'] / nr_tiles
+
+        # Room nr and tile nr of every block, in the order of the rooms and their tiles
+        rooms, tiles = np.nonzero(present)
+        colour_properties = [self._worldsettings['block_colors'][colour] for colour in colours[rooms, tiles]]
+        shape_properties = [self._worldsettings['block_shapes'][shape] for shape in shapes[rooms, tiles]]
+        self._generated_blocks.extend({"colour": colour, "shape": shape}
+                                      for colour, shape in zip(colour_properties, shape_properties))
+
+        # Add the blocks; a regular SquareBlock as denoted by the given 'callable_class' which the
+        # builder will use to create the object. The CollectableBlock has a `is_collectable` boolean
+        # as custom property so we can identify this as a collectible block.
+        self._builder.add_multiple_objects([tuple(loc) for loc in room_tiles[rooms, tiles].tolist()],
+                                           names=[f"Block in room_{room_nr}" for room_nr in rooms],
+                                           callable_classes=CollectableBlock,
+                                           custom_properties={'block_size': self._worldsettings['block_size']},
+                                           visualize_shapes=shape_properties, visualize_colours=colour_properties)
 
     def _addAgents(self):
         '''
@@ -191,6 +351,11 @@ class BW4TWorld:
         team_name = "Team 1" # currently this supports 1 team
         for agent in self._agents:
             brain = agent['botclass'](agent['settings'])
+            if isinstance(brain, BW4TAgentBrain):
+                brain.set_profiler(self._profiler)
+            if isinstance(brain, BW4TBrain) and self._blackboard is not None:
+                brain.set_blackboard(self._blackboard)
+            self._brains.append(brain)
             loc = (loc[0] + 1, loc[1])
             if agent['botclass']==Human:
                 self._builder.add_human_agent(loc, brain,
@@ -204,58 +369,75 @@ class BW4TWorld:
 
     def _addRooms(self):
         '''
-        @return room locations
+        @return array with shape (nr_rooms, nr_tiles_per_room, 2) with the
+        inner locations of each room where blocks can be placed
         '''
-        room_locations = {}
-        for room_nr in range(self._worldsettings['nr_rooms']):
-            room_top_left, door_loc = self.get_room_loc(room_nr)
-
+        room_top_lefts, door_locs = self._getRoomLocs(np.arange(self._worldsettings['nr_rooms']))
+        for room_nr, (room_top_left, door_loc) in enumerate(zip(room_top_lefts.tolist(), door_locs.tolist())):
             # We assign a simple random color to each room. Not for any particular reason except to brighting up the place.
             room_color = "#0000FF" #random.choice(self._worldsettings['room_colors'])
 
 
             # Add the room
             room_name = f"room_{room_nr}"
-            self._builder.add_room(top_left_location=room_top_left,
+            self._builder.add_room(top_left_location=tuple(room_top_left),
                  width=self._worldsettings['room_size'][0],
                  height=self._worldsettings['room_size'][1], name=room_name,
-                 door_locations=[door_loc],
+                 door_locations=[tuple(door_loc)],
                  wall_visualize_colour=self._worldsettings['wall_color'],
                  with_area_tiles=True, area_visualize_colour=room_color,
                  area_visualize_opacity=0.1)
 
-            # Find all inner room locations where we allow objects (making sure that the location behind to door is free)
-            room_locations[room_name] = get_room_locations(room_top_left, self._worldsettings['room_size'][0], self._worldsettings['room_size'][1])
-
-        return room_locations
+        # Find all inner room locations where we allow objects, in the same order as matrx.utils.get_room_locations
+        inner_x = np.arange(1, self._worldsettings['room_size'][0] - 1)
+        inner_y = np.arange(1, self._worldsettings['room_size'][1] - 1)
+        inner_tiles = np.stack(np.meshgrid(inner_x, inner_y, indexing='ij'), axis=-1).reshape(-1, 2)
+        return room_top_lefts[:, np.newaxis, :] + inner_tiles[np.newaxis, :, :]
 
 
     def get_room_loc(self,room_nr):
         '''
         @return room location (room_x, room_y), (door_x, door_y) for given room nr
         '''
-        row = np.floor(room_nr / self._worldsettings['rooms_per_row'])
-        column = room_nr % self._worldsettings['rooms_per_row']
+        room_top_lefts, door_locs = self._getRoomLocs(np.array([room_nr]))
+        return tuple(room_top_lefts[0].tolist()), tuple(door_locs[0].tolist())
+
+    def _getRoomLocs(self, room_nrs):
+        '''
+        @param room_nrs array with room numbers
+        @return arrays with shape (len(room_nrs), 2) with the room location
+        (room_x, room_y) and the door location (door_x, door_y) of each room
+        '''
+        row = room_nrs // self._worldsettings['rooms_per_row']
+        column = room_nrs % self._worldsettings['rooms_per_row']
 
         # x is: +1 for the edge, +edge hallway, +room width * column nr, +1 off by one
-        room_x = int(1 + self._worldsettings['hallway_space'] + (self._worldsettings['room_size'][0] * column) )
+        room_x = 1 + self._worldsettings['hallway_space'] + (self._worldsettings['room_size'][0] * column)
 
         # y is: +1 for the edge, +hallway space * (nr row + 1 for the top hallway), +row * room height, +1 off by one
-        room_y = int(1 + self._worldsettings['hallway_space'] * (row + 1) + row * self._worldsettings['room_size'][1] + 1)
+        room_y = 1 + self._worldsettings['hallway_space'] * (row + 1) + row * self._worldsettings['room_size'][1] + 1
 
         # door location is always center bottom
         door_x = room_x + int(np.ceil(self._worldsettings['room_size'][0] / 2))
         door_y = room_y + self._worldsettings['room_size'][1] - 1
 
-        return (room_x, room_y), (door_x, door_y)
+        return np.stack([room_x, room_y], axis=-1), np.stack([door_x, door_y], axis=-1)
 
 
-    def _addDropOffZones(self, world_size):
+    def _getDropOffZoneLocs(self, world_size):
+        '''
+        @return list with the bottom location (x, y) of each drop zone
+        '''
         x = int(np.ceil(world_size[0] / 2)) - \
             (int(np.floor(self._worldsettings['nr_drop_zones'] / 2)) * \
                 (self._worldsettings['hallway_space'] + 1))
         y = world_size[1] - 1 - 1  # once for off by one, another for world bound
-        for nr_zone in range(self._worldsettings['nr_drop_zones']):
+        # Each next zone is one hallway further to the right
+        return [(x + nr_zone * (self._worldsettings['hallway_space'] + 1), y)
+                for nr_zone in range(self._worldsettings['nr_drop_zones'])]
+
+    def _addDropOffAreas(self, world_size):
+        for nr_zone, (x, y) in enumerate(self._getDropOffZoneLocs(world_size)):
             # Add the zone's tiles. Area tiles are special types of objects in MATRX that simply function as
             # a kind of floor. They are always traversable and cannot be picked up.
             self._builder.add_area((x, y - self._worldsettings['nr_blocks_needed'] + 1),
@@ -265,20 +447,22 @@ class BW4TWorld:
                  drop_zone_nr=nr_zone, is_drop_zone=True,
                  is_goal_block=False, is_collectable=False)
 
+    def _addGoalBlocks(self, world_size):
+        for nr_zone, (x, y) in enumerate(self._getDropOffZoneLocs(world_size)):
             # Go through all needed blocks
             for nr_block in range(self._worldsettings['nr_blocks_needed']):
 
                 if self._only_completable:
                     # Choose random generated block as goal block
-                    idx = random.randint(0, len(self._generated_blocks) - 1)
+                    idx = self._rng.randint(0, len(self._generated_blocks))
                     colour_property = self._generated_blocks[idx]["colour"]
                     shape_property = self._generated_blocks[idx]["shape"]
                     # Remove block from temp array
                     self._generated_blocks.pop(idx)
                 else:
                     # Create a MATRX random property of shape and color so each world contains different blocks to collect
-                    colour_property = self._worldsettings['block_colors'][random.randint(0, 2)]
-                    shape_property = self._worldsettings['block_shapes'][random.randint(0, 2)]
+                    colour_property = self._worldsettings['block_colors'][self._rng.randint(0, 3)]
+                    shape_property = self._worldsettings['block_shapes'][self._rng.randint(0, 3)]
 
                 # Add a 'ghost image' of the block that should be collected. This can be seen by both humans and agents to
                 # know what should be collected in what order.
@@ -287,6 +471,3 @@ class BW4TWorld:
                    name="Collect Block", callable_class=GhostBlock,
                    visualize_colour=colour_property, visualize_shape=shape_property,
                    drop_zone_nr=nr_zone, block_size=self._worldsettings['block_size'])
-
-            # Change the x to the next zone
-            x = x + self._worldsettings['hallway_space'] + 1
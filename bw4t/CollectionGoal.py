@@ -27,6 +27,15 @@ class CollectionGoal(WorldGoal):
         # We also track the progress
         self.__progress = 0
 
+        # The tick and result of the last check, as the goal is checked both by the world and the logger each tick
+        self.__checked_tick = None
+        self.__is_satisfied = False
+
+        # For each rank of each zone the ids of the blocks at its location during the last completion check.
+        # Blocks are only grabbed from or dropped on a drop zone a few times per world, so the completion is only
+        # checked again when these change.
+        self.__drop_off_contents = None
+
     #override
     def goal_reached(self, grid_world: GridWorld):
         if grid_world.current_nr_ticks >= self.max_nr_ticks:
@@ -41,13 +50,38 @@ class CollectionGoal(WorldGoal):
         if self.__drop_off =={}:  # find all drop off locations, its tile ID's and goal blocks
             self.__find_drop_off_locations(grid_world)
 
+        if self.__checked_tick == grid_world.current_nr_ticks:
+            return self.__is_satisfied
+        self.__checked_tick = grid_world.current_nr_ticks
+
+        # Nothing was grabbed from or dropped on a drop zone since the last check, so the result is the same
+        contents = self.__get_drop_off_contents(grid_world)
+        if contents == self.__drop_off_contents:
+            return self.__is_satisfied
+        self.__drop_off_contents = contents
+
         # Go through each drop zone, and check if the blocks are there in the right order
-        is_satisfied, progress = self.__check_completion(grid_world)
+        self.__is_satisfied, progress = self.__check_completion(grid_world)
 
         # Progress in percentage
         self.__progress = progress / sum([len(goal_blocks)\
             for goal_blocks in self.__drop_off.values()])
-        return is_satisfied
+        return self.__is_satisfied
+
+    def __get_drop_off_contents(self, grid_world:GridWorld):
+        '''
+        @return list with the ids of the collectable blocks at the location of each rank of each zone
+        '''
+        all_objs = grid_world.environment_objects
+        contents = []
+        for goal_blocks in self.__drop_off.values():
+            for block_data in goal_blocks.values():
+                loc = block_data[0]
+                # The grid holds the ids of all objects and agents at each location
+                obj_ids = grid_world.grid[loc[1], loc[0]] or []
+                contents.append(tuple(obj_id for obj_id in obj_ids if obj_id in all_objs
+                                      and all_objs[obj_id].custom_properties.get("is_collectable", False)))
+        return contents
 
     def __find_drop_off_locations(self, grid_world:GridWorld):
 
@@ -3,16 +3,21 @@ import sys
 import csv
 import os
 
+import numpy as np
+
+from bw4t.BW4TLogger import readBinaryLog
+
 MOVES=['MoveNorth','MoveNorthEast','MoveEast','MoveSouthEast',
        'MoveSouth','MoveSouthWest','MoveWest','MoveNorthWest']
 
 class Statistics:
     def __init__(self, filename:str):
         '''
-        @param filename the path to the csv file to read.
+        @param filename the path to the csv file to read, or to the .bin file
+        of a BW4TBinaryLogger which is read without parsing text.
         It  is assumed that first row of the file contains the element headers
         and these are used as dict keys.
-        header is assumed to have keys like 
+        header is assumed to have keys like
         done;agent1_344_msgs;agent1_344_drops;agent2_345_msgs;
         agent2_345_drops;human1_346_msgs;human1_346_drops;
         agent1_344_acts;agent2_345_acts;human1_346_acts;world_nr;tick_nr
@@ -21,81 +26,139 @@ class Statistics:
         drops contains number of drops IN DROP ZONE.
         '''
         self._filename=filename
-        self._contents=self._read()
+        # Action names of the codes in the _acts columns of a binary log, None for a csv log
+        self._action_names=None
+        if filename.endswith('.bin'):
+            self._header, records, self._action_names=readBinaryLog(filename)
+            self._columns={name: records[name] for name in self._header}
+        else:
+            self._header, self._columns=self._read()
         self._analyse()
-        
-    def _read(self)->List[Dict[str,str]]:
+
+    def _read(self):
         '''
         read contents from csv file
-        @return it as list of dictionaries, one dictionary for each row.
-        It  is assumed that first row of the file contains the element headers
-        and these are used as dict keys.
-        The dict for each row contains the keys which are the element headers,
-        and the values which is the value in the column of that header
-        eg if file has header "name","id" and a row "jan,12" then the dict
-        for that row will be {'name':jan, 'id':12}.
+        @return tuple (header, columns). header is the list of element headers
+        in the first row of the file. columns is a dict with as keys the
+        element headers and as values a numpy array with the values in the
+        column of that header, one element for each row.
+        eg if file has header "name","id" and rows "jan,12" and "piet,13" then
+        columns is {'name':array(['jan','piet']), 'id':array(['12','13'])}.
         '''
-        header:List[str]=[]
-        contents:List[Dict[str,str]]=[]
         with open(self._filename) as csvfile:
             reader = csv.reader(csvfile, delimiter=';', quotechar="'")
-            for row in reader:
-                if header==[]:
-                    header=row
-                    continue
-                res = {header[i]: row[i] for i in range(len(header))} 
-                contents.append(res)
-        return contents
+            header:List[str]=next(reader, [])
+            rows=[row for row in reader]
+        if len(rows)==0:
+            return header, {name: np.array([], dtype=str) for name in header}
+        return header, {name: np.array(column) for name, column in zip(header, zip(*rows))}
 
     def _analyse(self):
         '''
-        analyse the performance log dictionary contained in _contents.
-        Dict is assumed to have keys like 
+        analyse the performance log columns contained in _columns.
+        Columns are assumed to have keys like
         done;agent1_344_msgs;agent1_344_drops;agent2_345_msgs;
         agent2_345_drops;human1_346_msgs;human1_346_drops;
         agent1_344_acts;agent2_345_acts;human1_346_acts;world_nr;tick_nr
- 
+
+        The actions of each agent are coded as indices into the sorted
+        list of distinct action names (or into the action names of a
+        binary log, which are stored as codes), so all counts are
+        reductions over integer arrays.
         '''
         agents=self.getAgents()
-        self._moves={agent:0 for agent in agents}
-        self._messages={agent:0 for agent in agents}
-        self._drops={agent:0 for agent in agents}
-        for row in self._contents:
-            for agent in agents:
-                if row[agent+'_acts']  in MOVES:
-                    self._moves[agent] += 1
-                if 'DropObject'==row[agent+'_acts']:
-                    self._drops[agent]+=1
-                self._messages[agent] = row[agent+'_mssg']
-                
+        self._actions={}
+        self._move_timeline={}
+        self._drop_timeline={}
+        self._message_timeline={}
+        for agent in agents:
+            if self._action_names is None:
+                names, codes = np.unique(self._columns[agent+'_acts'], return_inverse=True)
+            else:
+                names, codes = np.array(self._action_names, dtype=str), self._columns[agent+'_acts']
+            self._actions[agent]=(names, codes)
+            self._move_timeline[agent]=np.cumsum(np.isin(names, MOVES)[codes])
+            self._drop_timeline[agent]=np.cumsum((names=='DropObject')[codes])
+            self._message_timeline[agent]=self._columns[agent+'_mssg'].astype(int)
+        self._moves={agent:int(self._move_timeline[agent][-1]) for agent in agents}
+        self._drops={agent:int(self._drop_timeline[agent][-1]) for agent in agents}
+        self._messages={agent:str(self._columns[agent+'_mssg'][-1]) for agent in agents}
+
+    @classmethod
+    def fromSummary(cls, summary:dict):
+        '''
+        @param summary a dict as returned by getSummary
+        @return Statistics with the values of the summary. There is no
+        log file to read, so the timelines are not available.
+        '''
+        statistics=cls.__new__(cls)
+        statistics._filename=summary['filename']
+        statistics._header=[agent+'_acts' for agent in summary['agents']]
+        statistics._columns={'tick_nr':np.array([summary['last_tick']]), 'done':np.array([summary['success']])}
+        statistics._actions={}
+        statistics._move_timeline={}
+        statistics._drop_timeline={}
+        statistics._message_timeline={}
+        statistics._moves=dict(summary['moves'])
+        statistics._drops=dict(summary['drops'])
+        statistics._messages=dict(summary['messages'])
+        return statistics
+
+    def getSummary(self):
+        '''
+        @return dict with the filename, agents, success, messages, drops,
+        moves and last tick, that can be stored as json and turned back
+        into Statistics with fromSummary
+        '''
+        return {'filename': self._filename, 'agents': self.getAgents(), 'success': self.isSucces(),
+                'messages': self._messages, 'drops': self._drops, 'moves': self._moves,
+                'last_tick': self.getLastTick()}
+
     def getLastTick(self):
         '''
         @return tick nr of last line
         '''
-        return self._contents[-1]['tick_nr']        
-    
+        return str(self._columns['tick_nr'][-1])
+
     def isSucces(self):
         '''
-        return 'done' field of last row 
+        return 'done' field of last row
         '''
-        return self._contents[len(self._contents)-1]['done']
-    
+        return str(self._columns['done'][-1])
+
     def getAgents(self):
         '''
         @return list of agents in the contents
         '''
-        if len(self._contents)==0:
+        if len(self._columns.get('tick_nr', []))==0:
             return []
         agents =[]
-        for header in self._contents[0].keys():
+        for header in self._header:
             if header.endswith("_acts"):
                 agents.append(header[:len(header)-5])
         return agents
 
     def getDrops(self):
         return self._drops
-                
-    
+
+    def getMoves(self):
+        return self._moves
+
+    def getMessages(self):
+        return self._messages
+
+    def getTimelines(self):
+        '''
+        @return dict with for each agent a dict with the running number of
+        'moves', 'drops' and 'messages' at each logged tick.
+        Empty for Statistics created with fromSummary.
+        '''
+        return {agent: {'moves': self._move_timeline[agent],
+                        'drops': self._drop_timeline[agent],
+                        'messages': self._message_timeline[agent]}
+                for agent in self.getAgents() if agent in self._move_timeline}
+
+
     def __str__(self):
         return "Statistics for "+self._filename\
             +"\nagents:"+str(self.getAgents())\
@@ -105,11 +168,77 @@ class Statistics:
             +"\nmoves:"+str(self._moves)\
             +"\ntotal moves:"+str(sum(self._moves.values()))\
             +"\nlast tick:"+str(self.getLastTick())
-        
+
+
+class StatisticsBatch:
+    '''
+    The statistics of many runs of the same agents, stored as one array
+    per measure with one element for each run.
+    '''
+    def __init__(self, statistics:List[Statistics]):
+        '''
+        @param statistics the Statistics of each run
+        '''
+        self._statistics=statistics
+        self._agents=statistics[0].getAgents() if len(statistics)>0 else []
+        self._successes=np.array([s.isSucces()=='True' for s in statistics], dtype=bool)
+        self._last_ticks=np.array([int(s.getLastTick()) for s in statistics], dtype=int)
+        self._drops={agent: np.array([s.getDrops()[agent] for s in statistics], dtype=int)
+                     for agent in self._agents}
+        self._moves={agent: np.array([s.getMoves()[agent] for s in statistics], dtype=int)
+                     for agent in self._agents}
+
+    @classmethod
+    def fromFiles(cls, filenames:List[str]):
+        '''
+        @param filenames the paths to the csv files of the runs
+        @return StatisticsBatch of all the given log files
+        '''
+        return cls([Statistics(filename) for filename in filenames])
+
+    def getStatistics(self):
+        return self._statistics
+
+    def getAgents(self):
+        return self._agents
+
+    def getSuccesses(self):
+        '''
+        @return boolean array, True for each run that completed the goal
+        '''
+        return self._successes
+
+    def getSuccessRate(self):
+        '''
+        @return fraction of runs that completed the goal
+        '''
+        if len(self._successes)==0:
+            return 0.0
+        return float(np.mean(self._successes))
+
+    def getLastTicks(self):
+        '''
+        @return array with the last tick nr of each run
+        '''
+        return self._last_ticks
+
+    def getDrops(self):
+        '''
+        @return dict with for each agent an array of its drops in each run
+        '''
+        return self._drops
+
+    def getMoves(self):
+        '''
+        @return dict with for each agent an array of its moves in each run
+        '''
+        return self._moves
+
+
 if __name__ == "__main__":
     if len(sys.argv)!=2:
         raise ValueError("usage: "+sys.argv[0]+" <filename>")
     print (os.getcwd())
     print(Statistics(sys.argv[1]))
-    
-    
\ No newline at end of file
+
+
@@ -1,14 +1,19 @@
 import argparse
 import csv
+import multiprocessing
 import os
+import random
+import shutil
 import time
 
 import matplotlib.pyplot as plt
 import numpy as np
 
 from Group58Agent.Group58Agent import Group58Agent
+from Group58Agent.Trust import TRUST_POINTS
+from bw4t.BW4TResultCache import BW4TResultCache, getCodeVersion
 from bw4t.BW4TWorld import BW4TWorld, DEFAULT_WORLDSETTINGS
-from bw4t.statistics import Statistics
+from bw4t.statistics import Statistics, StatisticsBatch
 
 """
 This runs a single session. You have to log in on localhost:3000 and
@@ -16,9 +21,9 @@ press the start button in god mode to start the session.
 """
 
 
-def get_trust_from_file(agent_id, agents):
+def get_trust_from_file(agent_id, agents, folder="./trust/"):
     agents_ = []
-    file = "./trust/" + agent_id + ".csv"
+    file = os.path.join(folder, agent_id + ".csv")
 
     if not os.path.exists(file):
         for agent_ in agents:
@@ -66,6 +71,90 @@ def append_trust_round(agents_, trust_, trust_all_):
                                 agent_trust_[agent_name][round_idx] += float(trust_other[action_name])
 
 
+def run_episode(agents_, world_settings_, trust_folder, run_folder):
+    """
+    Runs a single round in its own folder, starting from the trust files in trust_folder.
+    The round's log and trust files are written inside run_folder.
+    @return tuple (log_file, world_fingerprint) with the absolute path of the round's log file
+    and the fingerprint of its world, see BW4TWorld.getWorldFingerprint
+    """
+    if os.path.exists(run_folder):
+        shutil.rmtree(run_folder)
+    if os.path.exists(trust_folder):
+        shutil.copytree(trust_folder, os.path.join(run_folder, "trust"))
+    else:
+        os.makedirs(run_folder)
+    os.chdir(run_folder)
+
+    random.seed(world_settings_["random_seed"])
+    world_ = BW4TWorld(agents_, world_settings_).run()
+    return os.path.abspath(world_.getLogger().getFileName()), world_.getWorldFingerprint()
+
+
+def get_trust_deltas(agents_, trust_before, folder="./trust/"):
+    """
+    @param trust_before the trust of each agent at the start of the round, as read by get_trust_from_file
+    @return dict with for each agent a dict with for each other agent the change of its trust per action,
+    between trust_before and the trust files in folder
+    """
+    deltas = {}
+    for agent_ in agents_:
+        before = {row["agent_id"]: row for row in trust_before[agent_["name"]]}
+        deltas[agent_["name"]] = {}
+        for row in get_trust_from_file(agent_["name"], agents_, folder):
+            deltas[agent_["name"]][row["agent_id"]] = {
+                action_name: float(row[action_name]) - float(before[row["agent_id"]][action_name])
+                for action_name in TRUST_POINTS}
+    return deltas
+
+
+def add_trust_deltas(agents_, deltas):
+    """
+    Adds trust changes, as returned by get_trust_deltas, to the shared trust files.
+    """
+    for agent_ in agents_:
+        current = {row["agent_id"]: row for row in get_trust_from_file(agent_["name"], agents_)}
+
+        rows = []
+        for agent_id, delta in deltas[agent_["name"]].items():
+            merged_row = {"agent_id": agent_id}
+            for action_name in TRUST_POINTS:
+                merged_row[action_name] = str(float(current[agent_id][action_name]) + delta[action_name])
+            rows.append(merged_row)
+
+        if not os.path.exists("./trust/"):
+            os.makedirs("./trust/")
+        file = "./trust/" + agent_["name"] + ".csv"
+        with open(file + ".tmp", 'w', newline='') as trust_file:
+            writer = csv.DictWriter(trust_file, fieldnames=["agent_id"] + list(TRUST_POINTS.keys()))
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(file + ".tmp", file)
+
+
+def merge_trust_round(agents_, trust_before, run_folder):
+    """
+    Adds the trust changes made during a round in run_folder to the shared trust files.
+    @param trust_before the trust of each agent at the start of the round, as read by get_trust_from_file
+    @return the trust changes, as returned by get_trust_deltas
+    """
+    deltas = get_trust_deltas(agents_, trust_before, os.path.join(run_folder, "trust"))
+    add_trust_deltas(agents_, deltas)
+    return deltas
+
+
+def get_episode_key(agents_, world_settings_, trust_before, code_version):
+    """
+    The world is not built for the key: it only depends on the world settings, including the random_seed,
+    and the code version.
+    @param world_settings_ the world settings of the episode, including its random_seed
+    @param trust_before the trust of each agent at the start of the episode, as read by get_trust_from_file
+    @return the key of the episode in the result cache
+    """
+    return BW4TResultCache.makeKey(agents=agents_, world_settings=world_settings_, trust=trust_before,
+                                   code_version=code_version)
+
+
 if __name__ == "__main__":
     agents = [
         {
@@ -100,8 +189,40 @@ if __name__ == "__main__":
                         default=False)
     parser.add_argument("-visualizer", action='store_true', help="Show web visualizer", default=False)
     parser.add_argument("-n", action='store', help="How many times to run", default=10, type=int)
+    parser.add_argument("-workers", action='store', help="How many rounds to run in parallel", default=1, type=int)
+    parser.add_argument("-batch", action='store_true', help="Build the world once and only reset it between rounds",
+                        default=False)
+    parser.add_argument("-blackboard", action='store_true', help="Let the agents share knowledge on a blackboard",
+                        default=False)
+    parser.add_argument("-profile", action='store_true', help="Write the time agents spend per stage next to the log",
+                        default=False)
+    parser.add_argument("-binary_log", action='store_true', help="Log to a compact binary file instead of a csv file",
+                        default=False)
+    parser.add_argument("-cache", action='store_true', help="Reuse the results of episodes that were already run",
+                        default=False)
+    parser.add_argument("-recompute", action='store_true', help="Run all episodes again and replace their cached results",
+                        default=False)
+    parser.add_argument("-cache_mb", action='store', help="Max size of the result cache in MB", default=100, type=float)
+    parser.add_argument("-cache_days", action='store', help="Max age of cached results in days", default=30, type=float)
+    parser.add_argument("-decision_budget", action='store', help="Max milliseconds an agent spends on choosing per tick",
+                        default=None, type=float)
+    parser.add_argument("-optimal_allocation", action='store_true',
+                        help="Let the agents assign rooms and goal blocks with an optimal assignment", default=False)
 
     args = parser.parse_args()
+    if args.workers > 1 and args.visualizer:
+        parser.error("-workers can not be combined with -visualizer")
+    if args.workers > 1 and args.batch:
+        parser.error("-workers can not be combined with -batch")
+    if args.decision_budget is not None and args.cache:
+        # The budget is wall-clock time, so the results of a round depend on the speed of the machine
+        parser.error("-decision_budget can not be combined with -cache")
+    if args.decision_budget is not None:
+        for agent in agents:
+            agent["settings"]["decision_budget_ms"] = args.decision_budget
+    if args.optimal_allocation:
+        for agent in agents:
+            agent["settings"]["optimal_allocation"] = True
 
     if args.tournament and 1 < args.n:
 
@@ -133,43 +254,126 @@ if __name__ == "__main__":
             world_settings["run_matrx_api"] = False
             world_settings["run_matrx_visualizer"] = False
         world_settings["only_completable"] = True
-
-        for i in range(args.n):
-            world = BW4TWorld(agents, world_settings).run()
-            statistics = Statistics(world.getLogger().getFileName())
-            results.append(statistics)
-            print("\n### Run " + str(i + 1) + " statistics: ###\n")
-            print(statistics)
-
-            append_trust_round(agents, trust, trust_all)
+        world_settings["profile"] = args.profile
+        world_settings["team_blackboard"] = args.blackboard
+        world_settings["binary_log"] = args.binary_log
+
+        # Episodes are cached by their settings, agents, starting trust and the code of the agents and world
+        cache = None
+        if args.cache:
+            cache = BW4TResultCache("./results/cache/", max_bytes=int(args.cache_mb * 1024 * 1024),
+                                    max_age=args.cache_days * 24 * 3600)
+            code_version = getCodeVersion([os.path.join(os.path.dirname(os.path.abspath(__file__)), folder)
+                                           for folder in ["bw4t", "Group58Agent", "agents1"]])
+
+        if args.workers > 1:
+            # Rounds run in parallel batches that all start from the same trust files.
+            # Afterwards the trust changes of each round are added to the shared trust files in round order.
+            if not os.path.exists("./trust/"):
+                os.makedirs("./trust/")
+            trust_folder = os.path.abspath("./trust/")
+            runs_folder = os.path.abspath("./results/runs/")
+
+            with multiprocessing.Pool(processes=args.workers) as pool:
+                for batch_start in range(0, args.n, args.workers):
+                    batch = range(batch_start, min(batch_start + args.workers, args.n))
+                    trust_before = {agent["name"]: get_trust_from_file(agent["name"], agents) for agent in agents}
+
+                    # Every round has its own world and random agent choices
+                    batch_settings = {}
+                    for i in batch:
+                        batch_settings[i] = world_settings.copy()
+                        batch_settings[i]["random_seed"] = world_settings["random_seed"] + i
+
+                    episodes = []
+                    keys = {}
+                    cached = {}
+                    for i in batch:
+                        if cache is not None:
+                            keys[i] = get_episode_key(agents, batch_settings[i], trust_before, code_version)
+                            cached[i] = None if args.recompute else cache.get(keys[i])
+                            if cached[i] is not None:
+                                continue
+                        episodes.append((agents, batch_settings[i], trust_folder, os.path.join(runs_folder, str(i + 1))))
+
+                    episode_runs = iter(pool.starmap(run_episode, episodes))
+
+                    for i in batch:
+                        if cached.get(i) is not None:
+                            statistics = Statistics.fromSummary(cached[i]["statistics"])
+                            add_trust_deltas(agents, cached[i]["trust_deltas"])
+                        else:
+                            log_file, world_fingerprint = next(episode_runs)
+                            statistics = Statistics(log_file)
+                            deltas = merge_trust_round(agents, trust_before, os.path.join(runs_folder, str(i + 1)))
+                            if cache is not None:
+                                cache.put(keys[i], {"statistics": statistics.getSummary(), "trust_deltas": deltas,
+                                                    "world": world_fingerprint})
+                        results.append(statistics)
+                        print("\n### Run " + str(i + 1) + " statistics: ###\n")
+                        print(statistics)
+
+                        append_trust_round(agents, trust, trust_all)
+        else:
+            setup_time = 0.0
+            run_time = 0.0
+            world = None
+            for i in range(args.n):
+                # Every round has its own world and random agent choices, as with -workers
+                episode_settings = world_settings.copy()
+                episode_settings["random_seed"] = world_settings["random_seed"] + i
+                cached = None
+                if cache is not None:
+                    trust_before = {agent["name"]: get_trust_from_file(agent["name"], agents) for agent in agents}
+                    key = get_episode_key(agents, episode_settings, trust_before, code_version)
+                    cached = None if args.recompute else cache.get(key)
+
+                if cached is not None:
+                    statistics = Statistics.fromSummary(cached["statistics"])
+                    add_trust_deltas(agents, cached["trust_deltas"])
+                else:
+                    random.seed(episode_settings["random_seed"])
+                    if args.batch and world is not None:
+                        world = world.reset(episode_settings["random_seed"])
+                    else:
+                        world = BW4TWorld(agents, episode_settings)
+                    world.run()
+                    setup_time += world.getSetupTime()
+                    run_time += world.getRunTime()
+                    statistics = Statistics(world.getLogger().getFileName())
+                    if cache is not None:
+                        cache.put(key, {"statistics": statistics.getSummary(),
+                                        "trust_deltas": get_trust_deltas(agents, trust_before),
+                                        "world": world.getWorldFingerprint()})
+                results.append(statistics)
+                print("\n### Run " + str(i + 1) + " statistics: ###\n")
+                print(statistics)
+
+                append_trust_round(agents, trust, trust_all)
+            print("\nSetup time: {:.2f}s, tick time: {:.2f}s".format(setup_time, run_time))
+
+        if cache is not None:
+            print("\nCached episodes: {} of {}".format(cache.getHits(), args.n))
 
         minutes, seconds = divmod(divmod(time.time() - start, 3600)[1], 60)
         print("\n### DONE!", "({:0>2}:{:05.2f}".format(int(minutes), seconds) + ") ###\n")
 
-        ticks = []
+        batch = StatisticsBatch(results)
+        successes = batch.getSuccesses()
+        ticks = batch.getLastTicks()[successes].tolist()
 
         drops = {}
         for agent in agents:
-            drops[agent["name"]] = 0
-        completion = 0
-        for round_ in results:
-            if round_.isSucces() == "True":
-                completion += 1
-                ticks.append(int(round_.getLastTick()))
-                agent_drops = round_.getDrops()
-                for agent_name in agent_drops:
-                    drops[agent_name] += agent_drops[agent_name]
-
-        sum_drops = 0
-        for agent_name in drops:
-            sum_drops += drops[agent_name]
+            drops[agent["name"]] = int(batch.getDrops()[agent["name"]][successes].sum())
+
+        sum_drops = sum(drops.values())
 
         drops_string = "Drops Percentages:\n"
         for agent in agents:
             drops_string += "* " + agent["name"] + ": " + str(round(drops[agent["name"]] * 100 / sum_drops, 2)) + "%\n"
         print(drops_string)
 
-        print("Success rate: " + str(round(completion * 100 / len(results), 2)) + "%")
+        print("Success rate: " + str(round(batch.getSuccessRate() * 100, 2)) + "%")
 
         # Plot statistics graph
         fig = plt.gcf()
@@ -241,6 +445,12 @@ if __name__ == "__main__":
             plt.close(fig)
     else:
         print("Started world...")
-        world = BW4TWorld(agents).run()
+        world_settings = DEFAULT_WORLDSETTINGS.copy()
+        world_settings["profile"] = args.profile
+        world_settings["team_blackboard"] = args.blackboard
+        world_settings["binary_log"] = args.binary_log
+        world = BW4TWorld(agents, world_settings).run()
         print("DONE!")
         print(Statistics(world.getLogger().getFileName()))
+        if world.getProfiler() is not None:
+            print(world.getProfiler().summaryTable())
@@ -0,0 +1,84 @@
+import contextlib
+
+from Group58Agent.GoalDropper import GoalDropper
+from Group58Agent.FoundGoalBlocks import FoundGoalBlocks
+from Group58Agent.Knowledge import DropOffs, OtherAgents, Rooms
+from Group58Agent.PhaseHandler import Phase
+from Group58Agent.RoomChooser import RoomChooser
+
+
+class ManhattanOracle:
+    def distance(self, start_location, target_location):
+        return abs(start_location[0] - target_location[0]) + abs(start_location[1] - target_location[1])
+
+
+class FakeAgent:
+    '''
+    The knowledge an agent uses to allocate rooms and goal blocks, for a team that all sees the same world
+    '''
+
+    def __init__(self, agent_id, locations, rooms, goal_blocks):
+        self.agent_id = agent_id
+        self.agent_idx = list(locations).index(agent_id)
+        self.distance_oracle = ManhattanOracle()
+        self.state = {"World": {"nr_ticks": 1}}
+        self.other_agents = OtherAgents()
+        for idx, (other_id, location) in enumerate(locations.items()):
+            self.state[other_id] = {"location": location}
+            if other_id != agent_id:
+                self.other_agents.add(other_id, idx).location = location
+        self.rooms = Rooms()
+        for room_name, location in rooms.items():
+            self.rooms.add(room_name, location, room_name + "_door")
+        self.drop_offs = DropOffs()
+        self.drop_offs.add("#ff0000", 1, 0.5, (10, 20))
+        self.found_goal_blocks = FoundGoalBlocks()
+        for location in goal_blocks:
+            self.found_goal_blocks.add({"colour": "#ff0000", "shape": 1, "size": 0.5, "location": location,
+                                        "found_by": agent_id})
+
+    def profile(self, stage):
+        return contextlib.nullcontext()
+
+    def get_next_drop_off(self):
+        return self.drop_offs[0]
+
+
+# Both agents are closest to room_a, but room_b is close to bob only
+LOCATIONS = {"alice": (4, 10), "bob": (6, 10)}
+ROOMS = {"room_a": (5, 6), "room_b": (12, 10)}
+GOAL_BLOCKS = [(5, 8), (12, 11)]
+
+
+def make_team():
+    return [FakeAgent(agent_id, LOCATIONS, ROOMS, GOAL_BLOCKS) for agent_id in LOCATIONS]
+
+
+def test_agents_choosing_a_room_get_different_rooms():
+    team = make_team()
+    room_choosers = [RoomChooser(agent) for agent in team]
+    allocated = [room_chooser.allocate_room() for room_chooser in room_choosers]
+    assert [room.room_name for room, _ in allocated] == ["room_a", "room_b"]
+    assert [distance for _, distance in allocated] == [5, 6]
+    # The conflict check against the closest room of the other agent agrees with the assignment
+    assert not any(room_chooser.room_conflict(room, distance)
+                   for room_chooser, (room, distance) in zip(room_choosers, allocated))
+
+
+def test_agents_choosing_a_goal_get_different_blocks():
+    team = make_team()
+    for agent in team:
+        # The phase of other agents is set by the MessageHandler when they report a found goal block
+        for other_agent in agent.other_agents:
+            other_agent.phase = Phase.CHOOSE_GOAL
+    allocated = [GoalDropper(agent).allocate_goal_block() for agent in team]
+    assert [block["location"] for block, _ in allocated] == [(5, 8), (12, 11)]
+
+
+def test_agents_in_other_phases_are_not_allocated():
+    team = make_team()
+    for agent in team:
+        for other_agent in agent.other_agents:
+            other_agent.phase = Phase.GO_TO_ROOM
+    allocated = [RoomChooser(agent).allocate_room() for agent in team]
+    assert [room.room_name for room, _ in allocated] == ["room_a", "room_a"]
@@ -0,0 +1,45 @@
+import math
+
+import numpy as np
+import pytest
+
+from Group58Agent.RoomVisiter import sweep_plan
+
+
+# Returns the tiles the agent surely walks over when following a plan: the waypoints, and the tiles between two
+# waypoints on the same row or column, as the only shortest path between them is the straight one
+def walked_tiles(plan):
+    tiles = set(plan)
+    for (x_a, y_a), (x_b, y_b) in zip(plan, plan[1:]):
+        if x_a == x_b:
+            tiles.update((x_a, y) for y in range(min(y_a, y_b), max(y_a, y_b) + 1))
+        elif y_a == y_b:
+            tiles.update((x, y_a) for x in range(min(x_a, x_b), max(x_a, x_b) + 1))
+    return tiles
+
+
+# Returns the tiles inside a room, the room is generated with its door in the center of the bottom wall
+def inner_tiles(location, room_size):
+    width, height = room_size
+    door_x, door_y = location[0], location[1] - 1
+    left = door_x - int(np.ceil(width / 2)) + 1
+    top = door_y - height + 2
+    return [(x, y) for x in range(left, left + width - 2) for y in range(top, door_y)]
+
+
+@pytest.mark.parametrize("sense_range", [1, 2, 3, 4])
+@pytest.mark.parametrize("width", range(3, 13))
+@pytest.mark.parametrize("height", range(3, 11))
+def test_sweep_sees_every_tile_of_the_room(width, height, sense_range):
+    location = (20, 20)
+    plan = sweep_plan(location, (width, height), sense_range)
+    walked = walked_tiles(plan)
+    for tile in inner_tiles(location, (width, height)):
+        assert any(math.dist(tile, walked_tile) <= sense_range for walked_tile in walked), tile
+
+
+def test_room_is_seen_from_behind_the_door_only_when_its_top_corners_are_in_range():
+    # The top left corner of a 5x3 room is 2 tiles left of the tile behind the door
+    assert sweep_plan((20, 20), (5, 3), 2) == [(20, 20), (20, 19), (20, 18)]
+    # In a 5x4 room it is also a tile higher, at a distance of sqrt(5)
+    assert len(sweep_plan((20, 20), (5, 4), 2)) > 3